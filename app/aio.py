@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable, TypeVar
+
+
+T = TypeVar("T")
+
+
+async def run_in_thread(func: Callable[..., T], *args: Any) -> T:
+    """
+    Выполнить блокирующую функцию в пуле потоков по умолчанию.
+    В отличие от asyncio.to_thread не копирует contextvars и не оборачивает вызов в partial —
+    для STT и блокирующих HTTP-клиентов контекст не нужен.
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
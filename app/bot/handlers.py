@@ -1,27 +1,67 @@
 from __future__ import annotations
 
+import base64
+import hmac
+import itertools
 import os
+import re
+import secrets
+import tempfile
+import zoneinfo
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 
-from aiogram import Router, types, F
+from aiogram import Bot, Router, types, F
 import asyncio
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
-from sqlalchemy import select, or_
+from cachetools import TTLCache
+from sqlalchemy import bindparam, func, insert, select, update, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.calendar.google import fresh_access_token, insert_event, insert_events_batch
 from app.db.session import session_factory
-from app.db.models import User, Meeting
-from app.stt.vosk_engine import recognize_speech_ru
-from app.mistral_client import summarize_tasks, suggest_meeting_from_transcript, suggest_meetings_from_transcript
+from app.db.models import User, Meeting, Notification, OAuthToken
+from app.stt.vosk_engine import recognize_speech_ru_path_async
+from app.mistral_client import summarize_tasks_async, suggest_meetings_from_transcript_async
 
 
 router = Router()
 
+# Запросы к LLM упираются в сеть — ограничиваем одновременные
+_LLM_SEM = asyncio.Semaphore(int(os.getenv("LLM_CONCURRENCY", "8")))
+
+# Запросы строятся один раз: SQLAlchemy кэширует их компиляцию, значения передаются параметрами
+_USER_BY_TG_STMT = select(User).where(User.tg_id == bindparam("tg_id"))
+_USER_ID_BY_TG_STMT = select(User.id).where(User.tg_id == bindparam("tg_id"))
+# Пользователь и его Google-токен одним запросом
+_USER_WITH_GOOGLE_TOKEN_STMT = (
+    select(User, OAuthToken)
+    .join(OAuthToken, OAuthToken.user_id == User.id)
+    .where(User.tg_id == bindparam("tg_id"), OAuthToken.provider == "google")
+)
+
 
 def _public_url() -> str:
     return os.getenv("APP_PUBLIC_URL", "http://localhost:8000")
 
 
+@lru_cache(maxsize=64)
+def _zi(name: str) -> zoneinfo.ZoneInfo:
+    return zoneinfo.ZoneInfo(name)
+
+
+def _parse_local(value: str, tz: zoneinfo.ZoneInfo) -> datetime:
+    # Ровно "YYYY-MM-DD HH:MM" — быстрый C-путь fromisoformat. Остальное (например "9:30") — через strptime:
+    # fromisoformat принял бы и "2025-08-30", и время со смещением, которое затем молча заменилось бы на tz
+    if len(value) == 16 and value[4] == value[7] == "-" and value[10] == " " and value[13] == ":":
+        try:
+            return datetime.fromisoformat(value).replace(tzinfo=tz)
+        except ValueError:
+            pass
+    return datetime.strptime(value, "%Y-%m-%d %H:%M").replace(tzinfo=tz)
+
+
 CREATE_BTN = "➕ Создать встречу"
 
 def _reply_kb() -> types.ReplyKeyboardMarkup:
@@ -75,7 +115,7 @@ async def cmd_meetings(message: types.Message) -> None:
     until = now + timedelta(days=7)
 
     async with session_factory() as session:
-        user_res = await session.execute(select(User).where(User.tg_id == tg_id))
+        user_res = await session.execute(_USER_BY_TG_STMT, {"tg_id": tg_id})
         user = user_res.scalar_one_or_none()
         if not user:
             await message.answer("Сначала подключите календарь командой /start")
@@ -83,7 +123,7 @@ async def cmd_meetings(message: types.Message) -> None:
 
         # Показываем события, которые начинаются до конца окна и ещё не закончились
         q = (
-            select(Meeting)
+            select(Meeting.start_at, Meeting.title)
             .where(
                 Meeting.user_id == user.id,
                 Meeting.start_at <= until,
@@ -93,17 +133,17 @@ async def cmd_meetings(message: types.Message) -> None:
             .limit(10)
         )
         res = await session.execute(q)
-        meetings = res.scalars().all()
+        meetings = res.all()
 
     if not meetings:
         await message.answer("Ближайшие встречи не найдены в ближайшую неделю")
         return
 
-    lines = []
-    for m in meetings:
-        start_str = m.start_at.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M UTC") if m.start_at else "?"
-        title = m.title or "(без названия)"
-        lines.append(f"• {start_str} — {title}")
+    # timestamptz приходит из asyncpg уже в UTC
+    lines = [
+        f"• {f'{m.start_at:%Y-%m-%d %H:%M} UTC' if m.start_at else '?'} — {m.title or '(без названия)'}"
+        for m in meetings
+    ]
 
     await message.answer("Ближайшие встречи:\n" + "\n".join(lines))
 
@@ -123,108 +163,63 @@ async def cmd_settings(message: types.Message) -> None:
 @router.callback_query(F.data.startswith("snooze:"))
 async def on_snooze(callback: types.CallbackQuery) -> None:
     # формат: snooze:<notif_id>:<minutes>
+    _, _, rest = callback.data.partition(":")  # type: ignore[union-attr]
+    notif_id, _, minutes = rest.partition(":")
     try:
-        _, notif_id, minutes = callback.data.split(":", 2)  # type: ignore[union-attr]
+        notif_id = int(notif_id)
         minutes = int(minutes)
-    except Exception:
+    except ValueError:
         await callback.answer("Ошибка параметров", show_alert=True)
         return
 
+    # переносим на +minutes одним UPDATE без загрузки объекта
+    stmt = (
+        update(Notification)
+        .where(Notification.id == notif_id)
+        .values(scheduled_at=Notification.scheduled_at + timedelta(minutes=minutes), sent_at=None)
+        .returning(Notification.id)
+    )
     async with session_factory() as session:
-        from sqlalchemy import update, select
-        from app.db.models import Notification
-        res = await session.execute(select(Notification).where(Notification.id == int(notif_id)))
-        notif = res.scalar_one_or_none()
-        if not notif:
-            await callback.answer("Уведомление не найдено", show_alert=True)
-            return
-        # переносим на +minutes
-        from datetime import timedelta
-        notif.scheduled_at = notif.scheduled_at + timedelta(minutes=minutes)  # type: ignore[operator]
-        notif.sent_at = None
+        res = await session.execute(stmt)
         await session.commit()
+    if res.scalar_one_or_none() is None:
+        await callback.answer("Уведомление не найдено", show_alert=True)
+        return
 
     await callback.answer("Отложено", show_alert=False)
     await callback.message.edit_reply_markup(reply_markup=None)
 
 
 
-@router.message(F.voice | F.audio | F.video_note | F.video)
-async def on_voice_or_audio(message: types.Message) -> None:
-    target = message.voice or message.audio or message.video_note or message.video
-    if not target:
-        return
-
-    from io import BytesIO
-
-    # Статус распознавания
-    progress: types.Message | None = None
+async def _download_to_temp(bot: Bot, file_id: str) -> str:
+    # Файл пишется на диск по кускам; воркеру распознавания передаётся только путь
+    fd, path = tempfile.mkstemp(prefix="meet_bot_", suffix=".media")
+    os.close(fd)
     try:
-        progress = await message.answer("Получил файл. Шаг 1/4: скачивание…")
-    except Exception:
-        progress = None
+        await bot.download(file_id, destination=path)
+    except BaseException:
+        _unlink_quiet(path)
+        raise
+    return path
+
 
-    bio = BytesIO()
+def _unlink_quiet(path: str) -> None:
     try:
-        await message.bot.download(target, destination=bio)
-    except Exception:
-        await message.answer("Не удалось скачать файл из Telegram")
-        return
+        os.unlink(path)
+    except OSError:
+        pass
 
-    if progress:
-        try:
-            await progress.edit_text("Шаг 2/4: подготовка аудио (ffmpeg)…")
-        except Exception:
-            pass
 
-    audio_bytes = bio.getvalue()
-    try:
-        if progress:
-            try:
-                await progress.edit_text("Шаг 3/4: распознавание…")
-            except Exception:
-                pass
-        text = await asyncio.to_thread(recognize_speech_ru, audio_bytes)
-    except RuntimeError as e:
-        await message.answer(str(e))
-        return
-    except Exception as e:
-        await message.answer(f"Ошибка распознавания аудио: {e}")
+@router.message(F.voice | F.audio | F.video_note | F.video)
+async def on_voice_or_audio(message: types.Message) -> None:
+    target = message.voice or message.audio or message.video_note or message.video
+    if not target:
         return
+    await _process_media(message, target)
 
-    if text:
-        # Саммари через Mistral (в фоне, чтобы не блокировать event loop)
-        try:
-            if progress:
-                try:
-                    await progress.edit_text("Шаг 4/4: формирование саммари…")
-                except Exception:
-                    pass
-            summary = await asyncio.to_thread(summarize_tasks, text)
-        except Exception as e:
-            summary = f"(Ошибка саммаризации: {e})"
-        kb = types.InlineKeyboardMarkup(
-            inline_keyboard=[[types.InlineKeyboardButton(text="Создать встречу по этому диалогу", callback_data=f"mkmeet:{message.message_id}")]]
-        )
-        # Сохраним транскрипт в скрытый reply-to state через message_id
-        await message.answer(
-            "Распознал:\n" + text + "\n\n" + "Итоги и задачи:\n" + summary,
-            reply_markup=kb,
-        )
-        # Кэшируем транскрипт в памяти процесса на короткое время
-        _TRANSCRIPTS[message.message_id] = text
-        if progress:
-            try:
-                await progress.delete()
-            except Exception:
-                pass
-    else:
-        await message.answer("Не удалось распознать речь")
-        if progress:
-            try:
-                await progress.delete()
-            except Exception:
-                pass
+
+_ALLOWED_EXTS = frozenset({"mp3", "wav", "ogg", "opus", "m4a", "aac", "webm", "mp4", "mov", "mkv", "avi"})
+_AV_MIME_PREFIXES = ("audio/", "video/")
 
 
 @router.message(F.document)
@@ -234,54 +229,46 @@ async def on_audio_document(message: types.Message) -> None:
         return
     mt = (doc.mime_type or "").lower()
     name = (doc.file_name or "").lower()
-    allowed_ext = (".mp3", ".wav", ".ogg", ".opus", ".m4a", ".aac", ".webm", ".mp4", ".mov", ".mkv", ".avi")
-    if not (mt.startswith("audio/") or mt.startswith("video/") or any(name.endswith(ext) for ext in allowed_ext)):
+    if not (mt.startswith(_AV_MIME_PREFIXES) or name.rpartition(".")[2] in _ALLOWED_EXTS):
         return
+    await _process_media(message, doc)
 
-    from io import BytesIO
 
+async def _process_media(message: types.Message, target: types.Voice | types.Audio | types.VideoNote | types.Video | types.Document) -> None:
+    # Статус распознавания
     progress: types.Message | None = None
     try:
-        progress = await message.answer("Получил файл. Шаг 1/4: скачивание…")
+        progress = await message.answer("Получил файл. Шаг 1/2: скачивание и распознавание…")
     except Exception:
         progress = None
 
-    bio = BytesIO()
     try:
-        await message.bot.download(doc, destination=bio)
+        path = await _download_to_temp(message.bot, target.file_id)
     except Exception:
         await message.answer("Не удалось скачать файл из Telegram")
         return
 
-    if progress:
-        try:
-            await progress.edit_text("Шаг 2/4: подготовка аудио (ffmpeg)…")
-        except Exception:
-            pass
-
-    audio_bytes = bio.getvalue()
     try:
-        if progress:
-            try:
-                await progress.edit_text("Шаг 3/4: распознавание…")
-            except Exception:
-                pass
-        text = await asyncio.to_thread(recognize_speech_ru, audio_bytes)
+        text = await recognize_speech_ru_path_async(path)
     except RuntimeError as e:
         await message.answer(str(e))
         return
     except Exception as e:
         await message.answer(f"Ошибка распознавания аудио: {e}")
         return
+    finally:
+        _unlink_quiet(path)
 
     if text:
+        # Саммари через Mistral
         try:
             if progress:
                 try:
-                    await progress.edit_text("Шаг 4/4: формирование саммари…")
+                    await progress.edit_text("Шаг 2/2: формирование саммари…")
                 except Exception:
                     pass
-            summary = await asyncio.to_thread(summarize_tasks, text)
+            async with _LLM_SEM:
+                summary = await summarize_tasks_async(text)
         except Exception as e:
             summary = f"(Ошибка саммаризации: {e})"
         kb = types.InlineKeyboardMarkup(
@@ -291,30 +278,60 @@ async def on_audio_document(message: types.Message) -> None:
             "Распознал:\n" + text + "\n\n" + "Итоги и задачи:\n" + summary,
             reply_markup=kb,
         )
+        # Кэшируем транскрипт в памяти процесса на короткое время
         _TRANSCRIPTS[message.message_id] = text
-        if progress:
-            try:
-                await progress.delete()
-            except Exception:
-                pass
     else:
         await message.answer("Не удалось распознать речь")
-        if progress:
-            try:
-                await progress.delete()
-            except Exception:
-                pass
+    if progress:
+        try:
+            await progress.delete()
+        except Exception:
+            pass
 
 
-@router.message(F.text.regexp(r"^.+\|\s*\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}\s*\|\s*\d+$"))
-async def on_edit_submit(message: types.Message) -> None:
-    # Проверяем, ждём ли мы редактирование от этого пользователя
-    if not message.from_user:
-        return
-    tok = _EDIT_CONTEXT.pop(message.from_user.id, None)
-    if not tok:
-        return
-    payload = _MEETING_PROPOSALS.get(tok)
+# Кнопки одной встречи на карточке: строки из пар (начало подписи, префикс callback_data);
+# к подписи дописывается только номер встречи
+_MEETING_ROW_TEMPLATE: tuple[tuple[tuple[str, str], ...], ...] = (
+    (("✏️ Название ", "mkmeet_edit_title"), ("📅 Дата ", "mkmeet_edit_date")),
+    (("⏰ Время ", "mkmeet_edit_time"), ("⏳ Длит. ", "mkmeet_edit_dur")),
+    (("✅ Подтвердить ", "mkmeet_confirm"),),
+)
+# Кнопки без параметров — одни на все карточки, сообщение берётся из callback
+_CONFIRM_ALL_ROW = [types.InlineKeyboardButton(text="✅ Подтвердить все", callback_data="mkmeet_confirm_all")]
+_CANCEL_ROW = [types.InlineKeyboardButton(text="Отмена", callback_data="mkmeet_cancel:all")]
+
+
+def _card_keyboard(items: list[tuple[int, str]]) -> types.InlineKeyboardMarkup:
+    """Клавиатура карточки встреч по списку (номер, token_id)."""
+    kb_rows = [
+        [types.InlineKeyboardButton(text=f"{label}{idx}", callback_data=f"{prefix}:{tok}") for label, prefix in row]
+        for idx, tok in items
+        for row in _MEETING_ROW_TEMPLATE
+    ]
+    if len(items) > 1:
+        kb_rows.append(_CONFIRM_ALL_ROW)
+    kb_rows.append(_CANCEL_ROW)
+    return types.InlineKeyboardMarkup(inline_keyboard=kb_rows)
+
+
+def _card_text(items: list[tuple[str, dict]]) -> str:
+    """Текст карточки встреч по списку (token_id, payload), отсортированному по order."""
+    lines = ["Найдены встречи:"]
+    lines.extend(
+        f"{it.get('order')}) {it['title']} — {it['start_local']} МСК ({it['duration_min']} мин)"
+        for _, it in items
+    )
+    return "\n".join(lines)
+
+
+# Полная правка одной строкой: "Название | YYYY-MM-DD HH:MM | минуты"
+_EDIT_SUBMIT_RE = re.compile(r"^.+\|\s*\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}\s*\|\s*\d+$")
+
+
+async def _apply_edit_submit(message: types.Message, ctx: dict) -> None:
+    _EDIT_CONTEXT.pop(message.from_user.id, None)  # type: ignore[union-attr]
+    tok = ctx.get("tok")
+    payload = _MEETING_PROPOSALS.get(tok) if tok else None
     if not payload:
         await message.answer("Истёк кэш редактирования")
         return
@@ -322,10 +339,8 @@ async def on_edit_submit(message: types.Message) -> None:
     try:
         title_part, dt_part, dur_part = [p.strip() for p in message.text.split("|", 2)]  # type: ignore[union-attr]
         duration_min = int(dur_part)
-        from datetime import datetime, timezone, timedelta
-        import zoneinfo
-        tz = zoneinfo.ZoneInfo(payload.get("tz") or "Europe/Moscow")
-        dt_local = datetime.strptime(dt_part, "%Y-%m-%d %H:%M").replace(tzinfo=tz)
+        tz = _zi(payload.get("tz") or "Europe/Moscow")
+        dt_local = _parse_local(dt_part, tz)
         start_utc = dt_local.astimezone(timezone.utc)
         end_utc = (dt_local + timedelta(minutes=duration_min)).astimezone(timezone.utc)
     except Exception:
@@ -344,19 +359,63 @@ async def on_edit_submit(message: types.Message) -> None:
     await message.answer("Обновлено. Нажмите Подтвердить для создания встречи.", reply_markup=kb)
 
 
-# простейший кэш транскриптов в памяти процесса
-_TRANSCRIPTS: dict[int, str] = {}
+# кэш транскриптов в памяти процесса (ограничен по размеру и времени жизни)
+_TRANSCRIPTS: TTLCache[int, str] = TTLCache(maxsize=1024, ttl=3600)
 # кэш подготовленных предложений встреч
-_MEETING_PROPOSALS: dict[str, dict] = {}
-_EDIT_CONTEXT: dict[int, dict] = {}
+_MEETING_PROPOSALS: TTLCache[str, dict] = TTLCache(maxsize=1024, ttl=3600)
+_EDIT_CONTEXT: TTLCache[int, dict] = TTLCache(maxsize=512, ttl=600)
+# индекс предложений по сообщению-карточке: origin_message_id -> {token_id: payload}
+_PROPOSALS_BY_MSG: TTLCache[int, dict[str, dict]] = TTLCache(maxsize=1024, ttl=3600)
+
+
+# Токены предложений: HMAC от счётчика с секретом процесса — непредсказуемы, но без getrandom на каждый токен
+_TOKEN_KEY = secrets.token_bytes(16)
+_TOKEN_CTR = itertools.count()
+
+
+def _mint_token() -> str:
+    digest = hmac.new(_TOKEN_KEY, next(_TOKEN_CTR).to_bytes(8, "big"), "sha256").digest()
+    return base64.urlsafe_b64encode(digest[:6]).rstrip(b"=").decode()
+
+
+def _attach_proposal(token_id: str, chat_id: int, message_id: int) -> None:
+    payload = _MEETING_PROPOSALS.get(token_id)
+    if payload is None:
+        return
+    payload["origin_chat_id"] = chat_id
+    payload["origin_message_id"] = message_id
+    _PROPOSALS_BY_MSG.setdefault(message_id, {})[token_id] = payload
+
+
+def _drop_proposal(token_id: str) -> dict | None:
+    payload = _MEETING_PROPOSALS.pop(token_id, None)
+    if payload is not None and payload.get("origin_message_id") is not None:
+        group = _PROPOSALS_BY_MSG.get(payload["origin_message_id"])
+        if group is not None:
+            group.pop(token_id, None)
+    return payload
+
+
+def _restore_proposal(token_id: str, payload: dict) -> None:
+    # вернуть предложение, забранное _drop_proposal, если создать встречу не удалось
+    _MEETING_PROPOSALS[token_id] = payload
+    if payload.get("origin_message_id") is not None:
+        _PROPOSALS_BY_MSG.setdefault(payload["origin_message_id"], {})[token_id] = payload
+
+
+async def cache_sweep(interval: float = 60.0) -> None:
+    """Периодически освобождает память от просроченных записей кэшей."""
+    while True:
+        await asyncio.sleep(interval)
+        for cache in (_TRANSCRIPTS, _MEETING_PROPOSALS, _EDIT_CONTEXT, _PROPOSALS_BY_MSG):
+            cache.expire()
 
 
 @router.callback_query(F.data.startswith("mkmeet:"))
 async def on_create_meeting(callback: types.CallbackQuery) -> None:
     try:
-        _, mid = callback.data.split(":", 1)  # type: ignore[union-attr]
-        mid_i = int(mid)
-    except Exception:
+        mid_i = int(callback.data.partition(":")[2])  # type: ignore[union-attr]
+    except ValueError:
         await callback.answer("Ошибка параметров", show_alert=True)
         return
 
@@ -367,7 +426,8 @@ async def on_create_meeting(callback: types.CallbackQuery) -> None:
 
     # Предложение встречи от Mistral
     try:
-        meetings = await asyncio.to_thread(suggest_meetings_from_transcript, transcript)
+        async with _LLM_SEM:
+            meetings = await suggest_meetings_from_transcript_async(transcript)
     except Exception as e:
         await callback.answer(f"Ошибка планировщика: {e}", show_alert=True)
         return
@@ -377,13 +437,9 @@ async def on_create_meeting(callback: types.CallbackQuery) -> None:
         return
 
     # Парсим локальное время в UTC
-    from datetime import datetime, timedelta, timezone
-    import zoneinfo
     # Подготовим список встреч с возможностью редактирования
-    import secrets
-    import zoneinfo
     preview_lines: list[str] = ["Найдены встречи:"]
-    kb_rows: list[list[types.InlineKeyboardButton]] = []
+    card_items: list[tuple[int, str]] = []
     batch_tokens: list[str] = []
     for idx, m in enumerate(meetings, start=1):
         title = m.get("title") or "Встреча"
@@ -391,14 +447,13 @@ async def on_create_meeting(callback: types.CallbackQuery) -> None:
         tz_name = (m.get("timezone") or "Europe/Moscow")
         duration_min = int(m.get("duration_min") or 30)
         try:
-            tz = zoneinfo.ZoneInfo(tz_name)
-            dt_local = datetime.strptime(start_local, "%Y-%m-%d %H:%M").replace(tzinfo=tz)
+            dt_local = _parse_local(start_local, _zi(tz_name))
             start_utc = dt_local.astimezone(timezone.utc)
             end_utc = (dt_local + timedelta(minutes=duration_min)).astimezone(timezone.utc)
         except Exception:
             continue
 
-        token_id = secrets.token_urlsafe(6)
+        token_id = _mint_token()
         _MEETING_PROPOSALS[token_id] = {
             "title": title,
             "start_utc": start_utc,
@@ -412,44 +467,31 @@ async def on_create_meeting(callback: types.CallbackQuery) -> None:
             "order": idx,
         }
         batch_tokens.append(token_id)
+        card_items.append((idx, token_id))
         preview_lines.append(
             f"{idx}) {title} — {start_local} МСК ({duration_min} мин)"
         )
-        kb_rows.append([
-            types.InlineKeyboardButton(text=f"✏️ Название {idx}", callback_data=f"mkmeet_edit_title:{token_id}"),
-            types.InlineKeyboardButton(text=f"📅 Дата {idx}", callback_data=f"mkmeet_edit_date:{token_id}"),
-        ])
-        kb_rows.append([
-            types.InlineKeyboardButton(text=f"⏰ Время {idx}", callback_data=f"mkmeet_edit_time:{token_id}"),
-            types.InlineKeyboardButton(text=f"⏳ Длит. {idx}", callback_data=f"mkmeet_edit_dur:{token_id}"),
-        ])
-        kb_rows.append([types.InlineKeyboardButton(text=f"✅ Подтвердить {idx}", callback_data=f"mkmeet_confirm:{token_id}")])
-
-    if len(kb_rows) == 0:
+
+    if not card_items:
         await callback.answer("Не удалось распарсить встречи", show_alert=True)
         return
-    kb_rows.append([types.InlineKeyboardButton(text="Отмена", callback_data="mkmeet_cancel:all")])
-    kb = types.InlineKeyboardMarkup(inline_keyboard=kb_rows)
-    sent = await callback.message.answer("\n".join(preview_lines), reply_markup=kb)
+    sent = await callback.message.answer("\n".join(preview_lines), reply_markup=_card_keyboard(card_items))
     # проставим источник карточки в кэш
     for t in batch_tokens:
-        if t in _MEETING_PROPOSALS:
-            _MEETING_PROPOSALS[t]["origin_chat_id"] = sent.chat.id
-            _MEETING_PROPOSALS[t]["origin_message_id"] = sent.message_id
+        _attach_proposal(t, sent.chat.id, sent.message_id)
     await callback.answer()
 
 
 @router.callback_query(F.data.startswith("mkmeet_cancel:"))
 async def on_cancel_meeting(callback: types.CallbackQuery) -> None:
-    try:
-        _, tok = callback.data.split(":", 1)  # type: ignore[union-attr]
-    except Exception:
-        await callback.answer("Операция отменена", show_alert=False)
-        return
+    tok = callback.data.partition(":")[2]  # type: ignore[union-attr]
     if tok == "all":
-        _MEETING_PROPOSALS.clear()
+        # только предложения этой карточки, чужие черновики не трогаем
+        if callback.message:
+            for k in _PROPOSALS_BY_MSG.pop(callback.message.message_id, {}):
+                _MEETING_PROPOSALS.pop(k, None)
     else:
-        _MEETING_PROPOSALS.pop(tok, None)
+        _drop_proposal(tok)
     await callback.answer("Отменено", show_alert=False)
     await callback.message.edit_reply_markup(reply_markup=None)
 
@@ -457,19 +499,15 @@ async def on_cancel_meeting(callback: types.CallbackQuery) -> None:
 @router.message(F.text == CREATE_BTN)
 async def on_create_from_keyboard(message: types.Message) -> None:
     # Создаём пустой черновик одной встречи и рисуем карточку как при распознавании
-    import secrets
-    from datetime import datetime, timedelta, timezone
-    import zoneinfo
-
     tz_name = "Europe/Moscow"
-    tz = zoneinfo.ZoneInfo(tz_name)
+    tz = _zi(tz_name)
     now_local = datetime.now(tz).replace(second=0, microsecond=0)
     start_local = now_local.strftime("%Y-%m-%d %H:%M")
     duration_min = 30
     start_utc = now_local.astimezone(timezone.utc)
     end_utc = (now_local + timedelta(minutes=duration_min)).astimezone(timezone.utc)
 
-    token_id = secrets.token_urlsafe(6)
+    token_id = _mint_token()
     _MEETING_PROPOSALS[token_id] = {
         "title": "Встреча",
         "start_utc": start_utc,
@@ -484,188 +522,193 @@ async def on_create_from_keyboard(message: types.Message) -> None:
     }
 
     lines = ["Найдены встречи:", f"1) Встреча — {start_local} МСК ({duration_min} мин)"]
-    kb_rows: list[list[types.InlineKeyboardButton]] = []
-    kb_rows.append([
-        types.InlineKeyboardButton(text="✏️ Название 1", callback_data=f"mkmeet_edit_title:{token_id}"),
-        types.InlineKeyboardButton(text="📅 Дата 1", callback_data=f"mkmeet_edit_date:{token_id}"),
-    ])
-    kb_rows.append([
-        types.InlineKeyboardButton(text="⏰ Время 1", callback_data=f"mkmeet_edit_time:{token_id}"),
-        types.InlineKeyboardButton(text="⏳ Длит. 1", callback_data=f"mkmeet_edit_dur:{token_id}"),
-    ])
-    kb_rows.append([types.InlineKeyboardButton(text="✅ Подтвердить 1", callback_data=f"mkmeet_confirm:{token_id}")])
-    kb_rows.append([types.InlineKeyboardButton(text="Отмена", callback_data="mkmeet_cancel:all")])
-    kb = types.InlineKeyboardMarkup(inline_keyboard=kb_rows)
-    sent = await message.answer("\n".join(lines), reply_markup=kb)
-    _MEETING_PROPOSALS[token_id]["origin_chat_id"] = sent.chat.id
-    _MEETING_PROPOSALS[token_id]["origin_message_id"] = sent.message_id
+    sent = await message.answer("\n".join(lines), reply_markup=_card_keyboard([(1, token_id)]))
+    _attach_proposal(token_id, sent.chat.id, sent.message_id)
 
-@router.callback_query(F.data.startswith("mkmeet_confirm:"))
-async def on_confirm_meeting(callback: types.CallbackQuery) -> None:
-    try:
-        _, tok = callback.data.split(":", 1)  # type: ignore[union-attr]
-    except Exception:
-        await callback.answer("Ошибка параметров", show_alert=True)
-        return
-    payload = _MEETING_PROPOSALS.pop(tok, None)
-    if not payload:
-        await callback.answer("Нечего подтверждать (истёк кэш)", show_alert=True)
-        return
+_EVENT_DESCRIPTION = "Создано из голосовой заметки"
 
-    title = payload["title"]
-    start_utc = payload["start_utc"]
-    end_utc = payload["end_utc"]
 
-    # Найти пользователя и создать событие в Google
+def _event_body(payload: dict) -> dict:
+    return {
+        "summary": payload["title"],
+        "description": _EVENT_DESCRIPTION,
+        "start": {"dateTime": payload["start_utc"].isoformat()},
+        "end": {"dateTime": payload["end_utc"].isoformat()},
+    }
+
+
+def _meeting_row(user_id: int, payload: dict, event: dict) -> dict:
+    return {
+        "user_id": user_id,
+        "title": payload["title"],
+        "start_at": payload["start_utc"],
+        "end_at": payload["end_utc"],
+        "description": _EVENT_DESCRIPTION,
+        "external_id": event.get("id"),
+    }
+
+
+async def _google_token(session: AsyncSession, callback: types.CallbackQuery) -> tuple[int, str] | None:
+    """(user_id, свежий access-токен Google); при отсутствии подключения — отвечает на callback."""
     if not callback.from_user:
         await callback.answer("Неизвестный пользователь", show_alert=True)
-        return
+        return None
     tg_id = callback.from_user.id
-
-    async with session_factory() as session:
-        from sqlalchemy import select
-        res = await session.execute(select(User).where(User.tg_id == tg_id))
-        user = res.scalar_one_or_none()
-        if not user:
+    row = (await session.execute(_USER_WITH_GOOGLE_TOKEN_STMT, {"tg_id": tg_id})).first()
+    if row is None:
+        # Различаем "нет пользователя" и "нет токена" только в редком случае промаха
+        user_id = (await session.execute(_USER_ID_BY_TG_STMT, {"tg_id": tg_id})).scalar_one_or_none()
+        if user_id is None:
             await callback.answer("Сначала подключите Google календарь через /start", show_alert=True)
-            return
+        else:
+            await callback.answer("Нет подключения Google", show_alert=True)
+        return None
+    _, token = row
+    return token.user_id, await fresh_access_token(session, token)
 
-        # Создание события через Google API
-        from google.oauth2.credentials import Credentials
-        from googleapiclient.discovery import build
-        from google.auth.transport.requests import Request as GoogleRequest
 
-        from app.db.models import OAuthToken
-        result = await session.execute(
-            select(OAuthToken).where(OAuthToken.user_id == user.id, OAuthToken.provider == "google")
+async def _answer_google_error(callback: types.CallbackQuery, exc: Exception) -> None:
+    msg = str(exc)
+    if "Insufficient Permission" in msg or "insufficientPermissions" in msg:
+        await callback.answer(
+            "Недостаточно прав Google Calendar. Переподключите календарь через /start",
+            show_alert=True,
         )
-        token = result.scalar_one_or_none()
-        if not token:
-            await callback.answer("Нет подключения Google", show_alert=True)
-            return
+    else:
+        await callback.answer("Ошибка Google Calendar. Попробуйте позже.", show_alert=True)
 
-        creds = Credentials(
-            token=token.access_token,
-            refresh_token=token.refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=os.getenv("GOOGLE_CLIENT_ID"),
-            client_secret=os.getenv("GOOGLE_CLIENT_SECRET"),
-        )
-        if creds.expired and creds.refresh_token:
-            await asyncio.to_thread(creds.refresh, GoogleRequest())
-            token.access_token = creds.token
-            if creds.expiry:
-                token.expires_at = creds.expiry
-            await session.commit()
 
-        def _insert_event() -> str:
-            service = build("calendar", "v3", credentials=creds, cache_discovery=False)
-            body = {
-                "summary": title,
-                "description": "Создано из голосовой заметки",
-                "start": {"dateTime": start_utc.isoformat()},
-                "end": {"dateTime": end_utc.isoformat()},
-            }
-            ev = service.events().insert(calendarId="primary", body=body).execute()  # type: ignore[no-untyped-call]
-            return ev.get("id", "")
+@router.callback_query(F.data.startswith("mkmeet_confirm:"))
+async def on_confirm_meeting(callback: types.CallbackQuery) -> None:
+    tok = callback.data.partition(":")[2]  # type: ignore[union-attr]
+    payload = _drop_proposal(tok)
+    if not payload:
+        await callback.answer("Нечего подтверждать (истёк кэш)", show_alert=True)
+        return
 
+    # Найти пользователя и создать событие в Google
+    async with session_factory() as session:
         try:
-            _ = await asyncio.to_thread(_insert_event)
+            google = await _google_token(session, callback)
+            if google is None:
+                _restore_proposal(tok, payload)
+                return
+            user_id, access_token = google
+            event = await insert_event(access_token, _event_body(payload))
         except Exception as e:
-            msg = str(e)
-            if "Insufficient Permission" in msg or "insufficientPermissions" in msg:
-                await callback.answer(
-                    "Недостаточно прав Google Calendar. Переподключите календарь через /start",
-                    show_alert=True,
-                )
-            else:
-                await callback.answer("Ошибка Google Calendar. Попробуйте позже.", show_alert=True)
+            # временная ошибка Google — кнопка должна сработать повторно
+            _restore_proposal(tok, payload)
+            await _answer_google_error(callback, e)
             return
+        session.add(Meeting(**_meeting_row(user_id, payload, event)))
+        try:
+            await session.commit()
+        except Exception:
+            _restore_proposal(tok, payload)
+            raise
 
-        await callback.answer("Встреча создана", show_alert=False)
-        await callback.message.edit_reply_markup(reply_markup=None)
+    await callback.answer("Встреча создана", show_alert=False)
+    await callback.message.edit_reply_markup(reply_markup=None)
 
 
-@router.callback_query(F.data.startswith("mkmeet_edit_title:"))
-async def on_edit_title(callback: types.CallbackQuery) -> None:
-    try:
-        _, tok = callback.data.split(":", 1)  # type: ignore[union-attr]
-    except Exception:
-        await callback.answer("Ошибка параметров", show_alert=True)
+@router.callback_query(F.data == "mkmeet_confirm_all")
+async def on_confirm_all(callback: types.CallbackQuery) -> None:
+    # Все встречи карточки: один batch-запрос в Google и один executemany INSERT
+    group = _PROPOSALS_BY_MSG.get(callback.message.message_id) if callback.message else None
+    # Забираем предложения до первого await: повторное нажатие или ретрай callback их уже не увидит
+    claimed = [(k, _drop_proposal(k)) for k in list(group or {})]
+    claimed = sorted(((k, p) for k, p in claimed if p is not None), key=lambda kp: kp[1].get("order", 0))
+    if not claimed:
+        await callback.answer("Нечего подтверждать (истёк кэш)", show_alert=True)
         return
-    # удалить прошлый промпт, если был
-    ctx_prev = _EDIT_CONTEXT.get(callback.from_user.id or 0)
-    if ctx_prev and ctx_prev.get("prompt_chat_id") and ctx_prev.get("prompt_message_id"):
+    batch_tokens = [k for k, _ in claimed]
+    payloads = [p for _, p in claimed]
+
+    async with session_factory() as session:
+        error: Exception | None = None
         try:
-            await callback.bot.delete_message(chat_id=ctx_prev["prompt_chat_id"], message_id=ctx_prev["prompt_message_id"])  # type: ignore[index]
+            google = await _google_token(session, callback)
+            results = None if google is None else await insert_events_batch(google[1], [_event_body(p) for p in payloads])
+        except Exception as e:
+            results, error = None, e
+        if results is None:
+            for tok, p in claimed:
+                _restore_proposal(tok, p)
+            if error is not None:
+                await _answer_google_error(callback, error)
+            return
+        # несозданные в Google возвращаем на карточку
+        for tok, p, r in zip(batch_tokens, payloads, results):
+            if isinstance(r, Exception):
+                _restore_proposal(tok, p)
+        created = [(tok, p, r) for tok, p, r in zip(batch_tokens, payloads, results) if not isinstance(r, Exception)]
+        if not created:
+            await _answer_google_error(callback, results[0])  # type: ignore[arg-type]
+            return
+        try:
+            await session.execute(insert(Meeting), [_meeting_row(google[0], p, r) for _, p, r in created])
+            await session.commit()
         except Exception:
-            pass
-    sent = await callback.message.answer("Введите новое название встречи одним сообщением")
-    _EDIT_CONTEXT[callback.from_user.id] = {"tok": tok, "field": "title", "prompt_chat_id": sent.chat.id, "prompt_message_id": sent.message_id}  # type: ignore[index]
-    await callback.answer()
-
+            for tok, p, _ in created:
+                _restore_proposal(tok, p)
+            raise
 
-@router.callback_query(F.data.startswith("mkmeet_edit_date:"))
-async def on_edit_date(callback: types.CallbackQuery) -> None:
+    if len(created) == len(payloads):
+        await callback.answer("Встречи созданы", show_alert=False)
+        await callback.message.edit_reply_markup(reply_markup=None)
+        return
+    # Несозданные остаются на карточке — текст и кнопки только по ним, их можно подтвердить по одной
+    remaining = [(tok, p) for tok, p, r in zip(batch_tokens, payloads, results) if isinstance(r, Exception)]
+    await callback.answer(f"Создано встреч: {len(created)} из {len(payloads)}", show_alert=True)
     try:
-        _, tok = callback.data.split(":", 1)  # type: ignore[union-attr]
+        await callback.message.edit_text(
+            _card_text(remaining),
+            reply_markup=_card_keyboard([(p.get("order"), tok) for tok, p in remaining]),
+        )
     except Exception:
-        await callback.answer("Ошибка параметров", show_alert=True)
-        return
-    ctx_prev = _EDIT_CONTEXT.get(callback.from_user.id or 0)
-    if ctx_prev and ctx_prev.get("prompt_chat_id") and ctx_prev.get("prompt_message_id"):
-        try:
-            await callback.bot.delete_message(chat_id=ctx_prev["prompt_chat_id"], message_id=ctx_prev["prompt_message_id"])  # type: ignore[index]
-        except Exception:
-            pass
-    sent = await callback.message.answer("Введите дату в формате YYYY-MM-DD (МСК)")
-    _EDIT_CONTEXT[callback.from_user.id] = {"tok": tok, "field": "date", "prompt_chat_id": sent.chat.id, "prompt_message_id": sent.message_id}  # type: ignore[index]
-    await callback.answer()
+        pass
 
 
-@router.callback_query(F.data.startswith("mkmeet_edit_time:"))
-async def on_edit_time(callback: types.CallbackQuery) -> None:
-    try:
-        _, tok = callback.data.split(":", 1)  # type: ignore[union-attr]
-    except Exception:
-        await callback.answer("Ошибка параметров", show_alert=True)
-        return
-    ctx_prev = _EDIT_CONTEXT.get(callback.from_user.id or 0)
-    if ctx_prev and ctx_prev.get("prompt_chat_id") and ctx_prev.get("prompt_message_id"):
-        try:
-            await callback.bot.delete_message(chat_id=ctx_prev["prompt_chat_id"], message_id=ctx_prev["prompt_message_id"])  # type: ignore[index]
-        except Exception:
-            pass
-    sent = await callback.message.answer("Введите время в формате HH:MM (МСК)")
-    _EDIT_CONTEXT[callback.from_user.id] = {"tok": tok, "field": "time", "prompt_chat_id": sent.chat.id, "prompt_message_id": sent.message_id}  # type: ignore[index]
-    await callback.answer()
+# Поле правки по суффиксу callback_data "mkmeet_edit_<op>:<token>": (поле в контексте, подсказка)
+_FIELD_PROMPTS = {
+    "title": ("title", "Введите новое название встречи одним сообщением"),
+    "date": ("date", "Введите дату в формате YYYY-MM-DD (МСК)"),
+    "time": ("time", "Введите время в формате HH:MM (МСК)"),
+    "dur": ("dur", "Введите длительность в минутах (15/30/45/60)"),
+}
 
 
-@router.callback_query(F.data.startswith("mkmeet_edit_dur:"))
-async def on_edit_dur(callback: types.CallbackQuery) -> None:
-    try:
-        _, tok = callback.data.split(":", 1)  # type: ignore[union-attr]
-    except Exception:
+@router.callback_query(F.data.startswith("mkmeet_edit_"))
+async def on_edit_field(callback: types.CallbackQuery) -> None:
+    op, _, tok = callback.data.removeprefix("mkmeet_edit_").partition(":")  # type: ignore[union-attr]
+    spec = _FIELD_PROMPTS.get(op)
+    if spec is None or not tok:
         await callback.answer("Ошибка параметров", show_alert=True)
         return
+    field, prompt = spec
+    # удалить прошлый промпт, если был
     ctx_prev = _EDIT_CONTEXT.get(callback.from_user.id or 0)
     if ctx_prev and ctx_prev.get("prompt_chat_id") and ctx_prev.get("prompt_message_id"):
         try:
             await callback.bot.delete_message(chat_id=ctx_prev["prompt_chat_id"], message_id=ctx_prev["prompt_message_id"])  # type: ignore[index]
         except Exception:
             pass
-    sent = await callback.message.answer("Введите длительность в минутах (15/30/45/60)")
-    _EDIT_CONTEXT[callback.from_user.id] = {"tok": tok, "field": "dur", "prompt_chat_id": sent.chat.id, "prompt_message_id": sent.message_id}  # type: ignore[index]
+    sent = await callback.message.answer(prompt)
+    _EDIT_CONTEXT[callback.from_user.id] = {"tok": tok, "field": field, "prompt_chat_id": sent.chat.id, "prompt_message_id": sent.message_id}  # type: ignore[index]
     await callback.answer()
 
 
 @router.message(F.text)
 async def on_edit_text(message: types.Message) -> None:
+    # Единый обработчик текста: одна проверка контекста правки, затем одна попытка regex
     if not message.from_user:
         return
     ctx = _EDIT_CONTEXT.get(message.from_user.id)
     if not ctx:
         return
+    if _EDIT_SUBMIT_RE.match(message.text or ""):
+        await _apply_edit_submit(message, ctx)
+        return
     tok = ctx.get("tok")
     field = ctx.get("field")
     payload = _MEETING_PROPOSALS.get(tok)
@@ -674,9 +717,7 @@ async def on_edit_text(message: types.Message) -> None:
         return
 
     val = (message.text or "").strip()
-    from datetime import datetime, timezone, timedelta
-    import zoneinfo
-    tz = zoneinfo.ZoneInfo(payload.get("tz") or "Europe/Moscow")
+    tz = _zi(payload.get("tz") or "Europe/Moscow")
 
     try:
         if field == "title":
@@ -686,13 +727,13 @@ async def on_edit_text(message: types.Message) -> None:
         elif field == "date":
             # keep existing time
             tpart = payload.get("start_local", "00:00").split(" ")[-1]
-            dt_local = datetime.strptime(val + " " + tpart, "%Y-%m-%d %H:%M").replace(tzinfo=tz)
+            dt_local = _parse_local(val + " " + tpart, tz)
             payload["start_local"] = val + " " + tpart
             payload["start_utc"] = dt_local.astimezone(timezone.utc)
             payload["end_utc"] = (dt_local + timedelta(minutes=int(payload.get("duration_min") or 30))).astimezone(timezone.utc)
         elif field == "time":
             dpart = payload.get("start_local", "1970-01-01 00:00").split(" ")[0]
-            dt_local = datetime.strptime(dpart + " " + val, "%Y-%m-%d %H:%M").replace(tzinfo=tz)
+            dt_local = _parse_local(dpart + " " + val, tz)
             payload["start_local"] = dpart + " " + val
             payload["start_utc"] = dt_local.astimezone(timezone.utc)
             payload["end_utc"] = (dt_local + timedelta(minutes=int(payload.get("duration_min") or 30))).astimezone(timezone.utc)
@@ -704,7 +745,7 @@ async def on_edit_text(message: types.Message) -> None:
             # recalc end
             dpart = payload.get("start_local", "1970-01-01 00:00").split(" ")[0]
             tpart = payload.get("start_local", "1970-01-01 00:00").split(" ")[-1]
-            dt_local = datetime.strptime(dpart + " " + tpart, "%Y-%m-%d %H:%M").replace(tzinfo=tz)
+            dt_local = _parse_local(dpart + " " + tpart, tz)
             payload["end_utc"] = (dt_local + timedelta(minutes=mins)).astimezone(timezone.utc)
         else:
             return
@@ -738,35 +779,15 @@ async def on_edit_text(message: types.Message) -> None:
     msg_id = payload.get("origin_message_id")
     if chat_id and msg_id:
         # собрать весь список, отсортировав по order
-        items = [v for k, v in _MEETING_PROPOSALS.items() if v.get("origin_message_id") == msg_id]
-        items.sort(key=lambda x: x.get("order", 0))
-        lines = ["Найдены встречи:"]
-        kb_rows: list[list[types.InlineKeyboardButton]] = []
-        for it in items:
-            idx = it.get("order")
-            lines.append(f"{idx}) {it['title']} — {it['start_local']} МСК ({it['duration_min']} мин)")
-            tok2 = None
-            # найдём токен по объекту
-            for k, v in _MEETING_PROPOSALS.items():
-                if v is it:
-                    tok2 = k
-                    break
-            if not tok2:
-                continue
-            kb_rows.append([
-                types.InlineKeyboardButton(text=f"✏️ Название {idx}", callback_data=f"mkmeet_edit_title:{tok2}"),
-                types.InlineKeyboardButton(text=f"📅 Дата {idx}", callback_data=f"mkmeet_edit_date:{tok2}"),
-            ])
-            kb_rows.append([
-                types.InlineKeyboardButton(text=f"⏰ Время {idx}", callback_data=f"mkmeet_edit_time:{tok2}"),
-                types.InlineKeyboardButton(text=f"⏳ Длит. {idx}", callback_data=f"mkmeet_edit_dur:{tok2}"),
-            ])
-            kb_rows.append([types.InlineKeyboardButton(text=f"✅ Подтвердить {idx}", callback_data=f"mkmeet_confirm:{tok2}")])
-        if kb_rows:
-            kb_rows.append([types.InlineKeyboardButton(text="Отмена", callback_data="mkmeet_cancel:all")])
-            kb = types.InlineKeyboardMarkup(inline_keyboard=kb_rows)
+        group = _PROPOSALS_BY_MSG.get(msg_id) or {}
+        items = sorted(
+            ((k, v) for k, v in group.items() if k in _MEETING_PROPOSALS),
+            key=lambda kv: kv[1].get("order", 0),
+        )
+        if items:
+            kb = _card_keyboard([(it.get("order"), tok2) for tok2, it in items])
             try:
-                await message.bot.edit_message_text(chat_id=chat_id, message_id=msg_id, text="\n".join(lines), reply_markup=kb)
+                await message.bot.edit_message_text(chat_id=chat_id, message_id=msg_id, text=_card_text(items), reply_markup=kb)
             except Exception:
                 pass
 
@@ -775,22 +796,23 @@ async def on_edit_text(message: types.Message) -> None:
 async def on_ack(callback: types.CallbackQuery) -> None:
     # формат: ack:<notif_id>
     try:
-        _, notif_id = callback.data.split(":", 1)  # type: ignore[union-attr]
-    except Exception:
+        notif_id = int(callback.data.partition(":")[2])  # type: ignore[union-attr]
+    except ValueError:
         await callback.answer("Ошибка параметров", show_alert=True)
         return
 
+    stmt = (
+        update(Notification)
+        .where(Notification.id == notif_id)
+        .values(status="ack", sent_at=func.coalesce(Notification.sent_at, func.now()))
+        .returning(Notification.id)
+    )
     async with session_factory() as session:
-        from sqlalchemy import select
-        from app.db.models import Notification
-        res = await session.execute(select(Notification).where(Notification.id == int(notif_id)))
-        notif = res.scalar_one_or_none()
-        if not notif:
-            await callback.answer("Уведомление не найдено", show_alert=True)
-            return
-        notif.status = "ack"
-        notif.sent_at = notif.sent_at or datetime.now(timezone.utc)
+        res = await session.execute(stmt)
         await session.commit()
+    if res.scalar_one_or_none() is None:
+        await callback.answer("Уведомление не найдено", show_alert=True)
+        return
 
     await callback.answer("Ок", show_alert=False)
     await callback.message.edit_reply_markup(reply_markup=None)
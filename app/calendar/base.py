@@ -4,16 +4,18 @@ from abc import ABC, abstractmethod
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel, Field
+import msgspec
 
 
-class UnifiedEvent(BaseModel):
-    id: str = Field(..., description="Уникальный идентификатор события")
-    title: Optional[str] = Field(default=None, description="Заголовок события")
-    start_at: datetime = Field(..., description="Начало события (UTC)")
-    end_at: datetime = Field(..., description="Окончание события (UTC)")
-    description: Optional[str] = Field(default=None, description="Описание события")
-    location: Optional[str] = Field(default=None, description="Место проведения")
+class UnifiedEvent(msgspec.Struct, kw_only=True):
+    """Событие календаря в общем для провайдеров виде; данные уже проверены источником, без валидации."""
+
+    id: str  # Уникальный идентификатор события
+    title: Optional[str] = None  # Заголовок события
+    start_at: datetime  # Начало события (UTC)
+    end_at: datetime  # Окончание события (UTC)
+    description: Optional[str] = None  # Описание события
+    location: Optional[str] = None  # Место проведения
 
 
 class CalendarProvider(ABC):
@@ -28,11 +28,6 @@ class FakeCalendarProvider(CalendarProvider):
             ),
         ]
 
-        result: list[UnifiedEvent] = []
-        for e in events:
-            overlaps = not (e.end_at <= time_min or e.start_at >= time_max)
-            if overlaps:
-                result.append(e)
-        return result
+        return [e for e in events if e.end_at > time_min and e.start_at < time_max]
 
 
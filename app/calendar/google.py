@@ -1,18 +1,186 @@
 from __future__ import annotations
 
 import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime, date, timedelta, timezone
+import json
 import os
-from typing import Any, List
+import re
+from typing import Any, AsyncIterator, List, Optional
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request as GoogleRequest
+import msgspec
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.calendar.base import CalendarProvider, UnifiedEvent
 from app.db.models import OAuthToken, User
+from app.http import get_http_client
+
+
+GOOGLE_TOKEN_URI = "https://oauth2.googleapis.com/token"
+GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
+GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
+GOOGLE_EVENTS_URL = "https://www.googleapis.com/calendar/v3/calendars/primary/events"
+GOOGLE_BATCH_URL = "https://www.googleapis.com/batch/calendar/v3"
+_EVENTS_INSERT_PATH = "/calendar/v3/calendars/primary/events"
+
+
+class GoogleApiError(RuntimeError):
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(f"Google API error {status_code}: {detail}")
+        self.status_code = status_code
+
+
+async def refresh_access_token(refresh_token: str) -> tuple[str, datetime | None]:
+    """Обменять refresh_token на новый access_token. Возвращает (token, expires_at)."""
+    resp = await get_http_client().post(
+        GOOGLE_TOKEN_URI,
+        data={
+            "client_id": GOOGLE_CLIENT_ID,
+            "client_secret": GOOGLE_CLIENT_SECRET,
+            "refresh_token": refresh_token,
+            "grant_type": "refresh_token",
+        },
+    )
+    if resp.is_error:
+        raise GoogleApiError(resp.status_code, resp.text)
+    data = resp.json()
+    expires_at = None
+    if data.get("expires_in"):
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=int(data["expires_in"]))
+    return data["access_token"], expires_at
+
+
+async def insert_event(access_token: str, body: dict[str, Any]) -> dict[str, Any]:
+    """Создать событие в основном календаре пользователя (events.insert)."""
+    resp = await get_http_client().post(
+        GOOGLE_EVENTS_URL,
+        json=body,
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    if resp.is_error:
+        raise GoogleApiError(resp.status_code, resp.text)
+    return resp.json()
+
+
+async def insert_events_batch(access_token: str, bodies: list[dict[str, Any]]) -> list[dict[str, Any] | GoogleApiError]:
+    """
+    Создать несколько событий одним batch-запросом (multipart/mixed).
+    Возвращает результаты в порядке bodies: созданное событие или GoogleApiError для части.
+    """
+    boundary = "batch_meet_bot"
+    parts = [
+        f"--{boundary}\r\n"
+        "Content-Type: application/http\r\n"
+        f"Content-ID: <item{i}>\r\n\r\n"
+        f"POST {_EVENTS_INSERT_PATH}\r\n"
+        "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+        f"{json.dumps(body, ensure_ascii=False)}\r\n"
+        for i, body in enumerate(bodies)
+    ]
+    parts.append(f"--{boundary}--\r\n")
+    resp = await get_http_client().post(
+        GOOGLE_BATCH_URL,
+        content="".join(parts).encode("utf-8"),
+        headers={
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": f"multipart/mixed; boundary={boundary}",
+        },
+    )
+    if resp.is_error:
+        raise GoogleApiError(resp.status_code, resp.text)
+
+    results: list[dict[str, Any] | GoogleApiError] = [GoogleApiError(0, "нет ответа в batch")] * len(bodies)
+    for content_id, status, payload in _split_batch_response(resp.headers.get("content-type", ""), resp.text):
+        try:
+            idx = int(content_id.rpartition("item")[2])
+        except ValueError:
+            continue
+        if 0 <= idx < len(bodies):
+            results[idx] = json.loads(payload) if status < 400 else GoogleApiError(status, payload)
+    return results
+
+
+_BATCH_BOUNDARY_RE = re.compile(r'boundary="?([^";]+)"?')
+_BATCH_BLANK_RE = re.compile(r"\r?\n\r?\n")
+
+
+def _split_batch_response(content_type: str, text: str) -> list[tuple[str, int, str]]:
+    # Каждая часть: заголовки части (Content-ID), пустая строка, HTTP-статус и заголовки ответа, пустая строка, тело
+    m = _BATCH_BOUNDARY_RE.search(content_type)
+    if not m:
+        return []
+    out: list[tuple[str, int, str]] = []
+    for part in text.split("--" + m.group(1)):
+        chunks = _BATCH_BLANK_RE.split(part.strip(), maxsplit=2)
+        if len(chunks) < 2:
+            continue
+        part_headers, http_head = chunks[0], chunks[1]
+        content_id = ""
+        for line in part_headers.splitlines():
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-id":
+                content_id = value.strip().strip("<>")
+        status_line = http_head.splitlines()[0] if http_head else ""
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            continue
+        out.append((content_id, status, chunks[2] if len(chunks) > 2 else ""))
+    return out
+
+
+class GTime(msgspec.Struct):
+    date_time: Optional[str] = msgspec.field(default=None, name="dateTime")
+    date: Optional[str] = None
+
+
+class GEvent(msgspec.Struct):
+    id: str = ""
+    summary: Optional[str] = None
+    description: Optional[str] = None
+    location: Optional[str] = None
+    start: GTime = msgspec.field(default_factory=GTime)
+    end: GTime = msgspec.field(default_factory=GTime)
+
+
+class GResponse(msgspec.Struct):
+    items: list[GEvent] = msgspec.field(default_factory=list)
+    next_page_token: Optional[str] = msgspec.field(default=None, name="nextPageToken")
+
+
+# Ответ events.list разбирается сразу в структуры, без промежуточных dict; лишние поля пропускаются
+_EVENTS_DECODER = msgspec.json.Decoder(GResponse)
+
+
+async def list_events(access_token: str, time_min: datetime, time_max: datetime) -> list[GEvent]:
+    """События основного календаря в интервале (events.list), все страницы."""
+    params: dict[str, Any] = {
+        "timeMin": _rfc3339(time_min),
+        "timeMax": _rfc3339(time_max),
+        "singleEvents": "true",
+        "orderBy": "startTime",
+        "maxResults": 2500,
+    }
+    headers = {"Authorization": f"Bearer {access_token}"}
+    client = get_http_client()
+    items: list[GEvent] = []
+    while True:
+        resp = await client.get(GOOGLE_EVENTS_URL, params=params, headers=headers)
+        if resp.is_error:
+            raise GoogleApiError(resp.status_code, resp.text)
+        page = _EVENTS_DECODER.decode(resp.content)
+        items.extend(page.items)
+        if not page.next_page_token:
+            return items
+        params["pageToken"] = page.next_page_token
+
+
+def _event_dt(value: GTime) -> datetime:
+    # Частый случай — dateTime: fromisoformat в 3.11 понимает "Z" сам; all-day (date) — полный разбор
+    if value.date_time:
+        return datetime.fromisoformat(value.date_time)
+    return _parse_google_datetime(value)[0]
 
 
 def _rfc3339(dt: datetime) -> str:
@@ -21,18 +189,94 @@ def _rfc3339(dt: datetime) -> str:
     return dt.isoformat()
 
 
-def _parse_google_datetime(value: dict[str, Any]) -> tuple[datetime, bool]:
+def _parse_google_datetime(value: GTime) -> tuple[datetime, bool]:
     # Returns (dt, is_all_day)
-    if "dateTime" in value and value["dateTime"]:
-        dt = datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))
+    if value.date_time:
+        dt = datetime.fromisoformat(value.date_time.replace("Z", "+00:00"))
         return dt, False
-    if "date" in value and value["date"]:
-        d = date.fromisoformat(value["date"])
+    if value.date:
+        d = date.fromisoformat(value.date)
         dt = datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
         return dt, True
     raise ValueError("Invalid Google event datetime format")
 
 
+# Кэш access-токенов на процесс: user_id -> (access_token, годен до). Пока запись свежая,
+# get_events не ходит ни в БД за токеном, ни в Google за refresh. Доступ к dict без await между
+# чтением и записью не перемежается в одном event loop — блокировка не нужна
+_TOKEN_CACHE: dict[int, tuple[str, datetime]] = {}
+_TOKEN_SKEW = timedelta(seconds=60)
+_TOKEN_CACHE_MAX_TTL = timedelta(minutes=10)
+# Блокировки загрузки/refresh по user_id: параллельные вызовы у истечения делают один refresh.
+# user_id -> [lock, сколько корутин его держат или ждут]; запись удаляется, когда лок никому не нужен
+_REFRESH_LOCKS: dict[int, list[Any]] = {}
+
+
+@asynccontextmanager
+async def _refresh_lock(user_id: int) -> AsyncIterator[None]:
+    entry = _REFRESH_LOCKS.get(user_id)
+    if entry is None:
+        entry = _REFRESH_LOCKS[user_id] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _REFRESH_LOCKS[user_id]
+
+
+def _cached_access_token(user_id: int) -> str | None:
+    cached = _TOKEN_CACHE.get(user_id)
+    if cached is not None and cached[1] > datetime.now(timezone.utc):
+        return cached[0]
+    return None
+
+
+def invalidate_token_cache(user_id: int) -> None:
+    """Убрать access-токен пользователя из кэша процесса (например, после переподключения Google с новыми правами)."""
+    _TOKEN_CACHE.pop(user_id, None)
+
+
+def _cache_deadline(expires_at: datetime | None, now: datetime) -> datetime:
+    cap = now + _TOKEN_CACHE_MAX_TTL
+    if expires_at is None:
+        return cap
+    return min(expires_at - _TOKEN_SKEW, cap)
+
+
+async def fresh_access_token(session: AsyncSession, token: OAuthToken) -> str:
+    """
+    Access-токен для строки OAuthToken: из кэша процесса или с refresh при скором (или неизвестном) истечении.
+    Refresh идёт под блокировкой пользователя, обновлённая строка коммитится в session, кэш обновляется.
+    """
+    user_id = token.user_id
+    cached = _cached_access_token(user_id)
+    if cached is not None:
+        return cached
+    # Одна загрузка/refresh на пользователя: остальные ждут и берут результат из кэша
+    async with _refresh_lock(user_id):
+        cached = _cached_access_token(user_id)
+        if cached is not None:
+            return cached
+        now = datetime.now(timezone.utc)
+        # Решение об обновлении — сравнение меток времени; свежий токен сразу идёт в заголовок Bearer
+        needs_refresh = token.expires_at is None or token.expires_at - now < _TOKEN_SKEW
+        if needs_refresh and token.refresh_token:
+            try:
+                token.access_token, new_expiry = await refresh_access_token(token.refresh_token)
+            except Exception:
+                _TOKEN_CACHE.pop(user_id, None)
+                raise
+            if new_expiry:
+                token.expires_at = new_expiry
+            await session.commit()
+
+        _TOKEN_CACHE[user_id] = (token.access_token, _cache_deadline(token.expires_at, now))
+        return token.access_token
+
+
 class GoogleCalendarProvider(CalendarProvider):
     def __init__(self, session: AsyncSession) -> None:
         self._session = session
@@ -42,70 +286,52 @@ class GoogleCalendarProvider(CalendarProvider):
         user: User,
         time_min: datetime,
         time_max: datetime,
+        token: OAuthToken | None = None,
     ) -> List[UnifiedEvent]:
-        # Load token
-        result = await self._session.execute(
-            select(OAuthToken).where(
-                OAuthToken.user_id == user.id, OAuthToken.provider == "google"
-            )
-        )
-        token: OAuthToken | None = result.scalar_one_or_none()
-        if token is None:
+        """token — заранее загруженная строка OAuthToken (см. preload_tokens), чтобы не делать SELECT."""
+        access_token = await self._access_token(user, token)
+        if access_token is None:
             return []
 
-        creds = Credentials(
-            token=token.access_token,
-            refresh_token=token.refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=os.getenv("GOOGLE_CLIENT_ID"),
-            client_secret=os.getenv("GOOGLE_CLIENT_SECRET"),
-        )
+        # Интервал отфильтрован на стороне Google (timeMin/timeMax) — повторной фильтрации в Python нет
+        items = await list_events(access_token, time_min, time_max)
 
-        # Refresh if needed
-        if creds.expired and creds.refresh_token:
-            await asyncio.to_thread(creds.refresh, GoogleRequest())
-            token.access_token = creds.token
-            if creds.expiry:
-                token.expires_at = creds.expiry
-            await self._session.commit()
-
-        # Build service and fetch events in a worker thread (blocking client)
-        def _fetch() -> list[dict[str, Any]]:
-            service = build("calendar", "v3", credentials=creds, cache_discovery=False)
-            events = (
-                service.events()  # type: ignore[no-untyped-call]
-                .list(
-                    calendarId="primary",
-                    timeMin=_rfc3339(time_min),
-                    timeMax=_rfc3339(time_max),
-                    singleEvents=True,
-                    orderBy="startTime",
-                )
-                .execute()
-            )
-            return events.get("items", [])
-
-        items = await asyncio.to_thread(_fetch)
-
-        unified: list[UnifiedEvent] = []
-        for it in items:
-            start_dt, start_all_day = _parse_google_datetime(it.get("start", {}))
-            end_dt, end_all_day = _parse_google_datetime(it.get("end", {}))
-            # Google all-day end is exclusive; normalize to inclusive end by subtracting 1 second
-            if start_all_day or end_all_day:
-                # keep start at 00:00, end at next day 00:00; client may treat as all-day
-                pass
-            unified.append(
-                UnifiedEvent(
-                    id=it.get("id", ""),
-                    title=it.get("summary"),
-                    start_at=start_dt,
-                    end_at=end_dt,
-                    description=it.get("description"),
-                    location=it.get("location"),
-                )
+        # Google all-day end is exclusive; keep start at 00:00, end at next day 00:00 — client may treat as all-day
+        dt = _event_dt
+        return [
+            UnifiedEvent(
+                id=it.id,
+                title=it.summary,
+                start_at=dt(it.start),
+                end_at=dt(it.end),
+                description=it.description,
+                location=it.location,
             )
+            for it in items
+        ]
 
-        return unified
-
+    @classmethod
+    async def preload_tokens(cls, session: AsyncSession, user_ids: list[int]) -> dict[int, OAuthToken]:
+        """Google-токены сразу для многих пользователей одним запросом: user_id -> OAuthToken."""
+        if not user_ids:
+            return {}
+        result = await session.execute(
+            select(OAuthToken).where(OAuthToken.user_id.in_(user_ids), OAuthToken.provider == "google")
+        )
+        return {t.user_id: t for t in result.scalars()}
 
+    async def _access_token(self, user: User, token: OAuthToken | None = None) -> str | None:
+        cached = _cached_access_token(user.id)
+        if cached is not None:
+            return cached
+        if token is None:
+            # Load token
+            result = await self._session.execute(
+                select(OAuthToken).where(
+                    OAuthToken.user_id == user.id, OAuthToken.provider == "google"
+                )
+            )
+            token = result.scalar_one_or_none()
+        if token is None:
+            return None
+        return await fresh_access_token(self._session, token)
@@ -6,11 +6,13 @@ from sqlalchemy import (
     BigInteger,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     UniqueConstraint,
     JSON,
+    text,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -45,7 +47,8 @@ class OAuthToken(Base):
     __tablename__ = "oauth_tokens"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    # отдельный индекс не нужен: uq_oauth_tokens_user_provider начинается с user_id
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
     provider: Mapped[str] = mapped_column(String(32), nullable=False)
     access_token: Mapped[str] = mapped_column(Text, nullable=False)
     refresh_token: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -74,6 +77,11 @@ class Meeting(Base):
 
     user: Mapped[User] = relationship(back_populates="meetings")
 
+    __table_args__ = (
+        # upsert синхронизации: ON CONFLICT (user_id, external_id)
+        Index("ix_meetings_user_external", "user_id", "external_id", unique=True),
+    )
+
 
 class Notification(Base):
     __tablename__ = "notifications"
@@ -89,6 +97,12 @@ class Notification(Base):
     user: Mapped[User] = relationship(back_populates="notifications")
     meeting: Mapped[Meeting | None] = relationship()
 
+    __table_args__ = (
+        UniqueConstraint("meeting_id", "scheduled_at", name="uq_notifications_meeting_sched"),
+        # очередь отправки: WHERE sent_at IS NULL AND scheduled_at <= now ORDER BY scheduled_at
+        Index("ix_notifications_pending", "scheduled_at", postgresql_where=text("sent_at IS NULL")),
+    )
+
 
 class Task(Base):
     __tablename__ = "tasks"
@@ -16,7 +16,23 @@ if DATABASE_URL.startswith("postgres://"):
 elif DATABASE_URL.startswith("postgresql://") and not DATABASE_URL.startswith("postgresql+asyncpg://"):
 	DATABASE_URL = "postgresql+asyncpg://" + DATABASE_URL[len("postgresql://"):]
 
-engine = create_async_engine(DATABASE_URL, echo=False, pool_pre_ping=True)
+# Пул рассчитан на параллельную работу планировщика и бота (размер — DB_POOL/DB_MAX_OVERFLOW). Вместо SELECT 1 перед каждой
+# выдачей соединения (pool_pre_ping) — плановое пересоздание соединений (pool_recycle).
+# Кэши prepared statements asyncpg/SQLAlchemy экономят parse/plan повторяющихся запросов
+engine = create_async_engine(
+	DATABASE_URL,
+	echo=False,
+	pool_size=int(os.getenv("DB_POOL", "20")),
+	max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "40")),
+	pool_recycle=1800,
+	pool_pre_ping=False,
+	connect_args={
+		"statement_cache_size": 1024,
+		"prepared_statement_cache_size": 512,
+		# короткие OLTP-запросы: JIT Postgres только добавляет время планирования
+		"server_settings": {"jit": "off"},
+	},
+)
 session_factory = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 
@@ -3,13 +3,15 @@ from __future__ import annotations
 from datetime import datetime, timezone
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+import msgspec
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import User
+from app.db.models import OAuthToken, User
 from app.db.session import get_async_session
 from app.calendar.google import GoogleCalendarProvider
+from app.tasks.scheduler import sync_google_events
 
 
 router = APIRouter(prefix="/debug", tags=["debug"])
@@ -32,25 +34,28 @@ async def list_google_events(
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=400, detail=f"Invalid datetime: {exc}")
 
-    # Pick user
-    if user_id is not None:
-        res = await session.execute(select(User).where(User.id == user_id))
-        user = res.scalar_one_or_none()
-    else:
-        res = await session.execute(select(User).order_by(User.id.asc()).limit(1))
-        user = res.scalar_one_or_none()
-    if not user:
+    # Pick user together with their Google token in one query
+    q = (
+        select(User, OAuthToken)
+        .outerjoin(OAuthToken, and_(OAuthToken.user_id == User.id, OAuthToken.provider == "google"))
+        .limit(1)
+    )
+    q = q.where(User.id == user_id) if user_id is not None else q.order_by(User.id.asc())
+    row = (await session.execute(q)).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="User not found")
+    user, token = row
+    if token is None:
+        return Response(content=b"[]", media_type="application/json")
 
     provider = GoogleCalendarProvider(session)
-    events = await provider.get_events(user, from_dt, to_dt)
-    return [e.model_dump() for e in events]
+    events = await provider.get_events(user, from_dt, to_dt, token=token)
+    # msgspec кодирует список структур в JSON сразу, без промежуточных dict
+    return Response(content=msgspec.json.encode(events), media_type="application/json")
 
 
 @router.post("/sync")
 async def run_sync(session: AsyncSession = Depends(get_async_session)):
-    from app.tasks.scheduler import sync_google_events
-
     try:
         await sync_google_events()
         return {"status": "ok"}
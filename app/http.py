@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import httpx
+
+
+_client: httpx.AsyncClient | None = None
+
+# HTTP/2 мультиплексирует запросы к одному хосту (Google API) в одном TLS-соединении
+_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+_TIMEOUT = httpx.Timeout(20.0)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Общий на процесс HTTP-клиент: keep-alive соединения переиспользуются между запросами."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(http2=True, limits=_LIMITS, timeout=_TIMEOUT)
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
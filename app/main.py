@@ -1,13 +1,69 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+import asyncio
+import os
+
+from aiogram import types
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.oauth import router as oauth_router
 from app.debug import router as debug_router
 from app.tasks.scheduler import create_scheduler
 from app.bot import build_bot, build_dispatcher
-import os
+from app.bot.handlers import cache_sweep
+from app.http import close_http_client
+from app.stt.vosk_engine import warmup_vosk
+
+
+# Публичный HTTPS-адрес вебхука (например https://bot.example.com/tg/webhook); без него — long polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_PATH = "/tg/webhook"
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Планировщик, бот и фоновые задачи живут в цикле сервера и останавливаются вместе с ним
+    bot = build_bot()
+    dp = build_dispatcher()
+    app.state.bot, app.state.dp = bot, dp
+
+    scheduler = create_scheduler(bot)
+    scheduler.start()
+
+    # Модель Vosk грузим до приёма обновлений, а не на первом голосовом
+    await warmup_vosk()
+
+    tasks = [asyncio.create_task(cache_sweep())]
+    if WEBHOOK_URL:
+        # Обновления приходят POST-запросами на /tg/webhook — без постоянного опроса getUpdates
+        await bot.set_webhook(
+            WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+    else:
+        async def _run_bot():
+            # На всякий случай убираем webhook, если был настроен где-то ещё
+            try:
+                await bot.delete_webhook(drop_pending_updates=True)
+            except Exception:
+                pass
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types(), handle_signals=False)
+
+        tasks.append(asyncio.create_task(_run_bot()))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        scheduler.shutdown(wait=False)
+        await bot.session.close()
+        await close_http_client()
 
 
-app = FastAPI(title=os.getenv("PROJECT_NAME", "meet-bot"))
+app = FastAPI(title=os.getenv("PROJECT_NAME", "meet-bot"), lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -19,6 +75,24 @@ app.include_router(oauth_router)
 app.include_router(debug_router)
 
 
+# Ссылки на фоновые обработки обновлений, чтобы задачи не собрал GC до завершения
+_update_tasks: set[asyncio.Task] = set()
+
+
+@app.post(WEBHOOK_PATH, include_in_schema=False)
+async def telegram_webhook(request: Request) -> Response:
+    if not WEBHOOK_URL:
+        return Response(status_code=404)
+    if WEBHOOK_SECRET and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET:
+        return Response(status_code=403)
+    update = types.Update.model_validate(await request.json(), context={"bot": app.state.bot})
+    # Отвечаем Telegram сразу: распознавание и LLM могут идти дольше его таймаута
+    task = asyncio.create_task(app.state.dp.feed_update(app.state.bot, update))
+    _update_tasks.add(task)
+    task.add_done_callback(_update_tasks.discard)
+    return Response(status_code=200)
+
+
 @app.get("/health")
 async def health() -> dict:
     return {"status": "ok"}
@@ -27,26 +101,5 @@ async def health() -> dict:
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
-
-else:
-    scheduler = create_scheduler()
-    scheduler.start()
-
-    # Запуск aiogram polling в фоне (без блокировки ASGI)
-    import asyncio
-
-    bot = build_bot()
-    dp = build_dispatcher()
-
-    async def _run_bot():
-        # На всякий случай убираем webhook, если был настроен где-то ещё
-        try:
-            await bot.delete_webhook(drop_pending_updates=True)
-        except Exception:
-            pass
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
-
-    asyncio.get_event_loop().create_task(_run_bot())
-
-
+    # loop="auto" берёт uvloop, если он установлен (не на Windows); бот работает в том же цикле
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True, loop="auto")
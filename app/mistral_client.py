@@ -1,37 +1,374 @@
 from __future__ import annotations
 
+import hashlib
 import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
 from typing import Any, Dict
 from datetime import datetime
 import zoneinfo
 
+from mistralai.async_client import MistralAsyncClient  # type: ignore
 from mistralai.client import MistralClient  # type: ignore
 from mistralai.models.chat_completion import ChatMessage  # type: ignore
+import json
 import re
 
+try:
+    # orjson разбирает ответы LLM в разы быстрее; принимает и str, и bytes
+    from orjson import loads as _json_loads  # type: ignore
+except ImportError:  # pragma: no cover
+    from json import loads as _json_loads
 
-def get_mistral_client() -> MistralClient:
+from app.aio import run_in_thread
+
+
+_async_client: MistralAsyncClient | None = None
+
+
+def _api_key() -> str:
     api_key = os.getenv("MISTRAL_API_KEY")
     if not api_key:
         raise RuntimeError("MISTRAL_API_KEY is not set")
-    return MistralClient(api_key=api_key)
+    return api_key
 
 
-def summarize_tasks(transcript: str) -> str:
+@lru_cache(maxsize=1)
+def get_mistral_client() -> MistralClient:
+    # Один клиент на процесс, как и асинхронный; в тестах сбрасывается через cache_clear()
+    return MistralClient(api_key=_api_key())
+
+
+def get_mistral_async_client() -> MistralAsyncClient:
+    # Один клиент на процесс: его httpx-пул соединений переиспользуется между запросами
+    global _async_client
+    if _async_client is None:
+        _async_client = MistralAsyncClient(api_key=_api_key())
+    return _async_client
+
+
+# Кэш ответов: точное совпадение (модель, системный промпт, транскрипт, temperature, max_tokens) -> текст ответа.
+# Для саммари текущее время из промпта в ключ не входит — ответ от него не зависит.
+# Ответы со встречами (timed) несут абсолютное время, вычисленное от «сейчас» («через час»),
+# поэтому их ключ включает текущую минуту и часовой пояс: устаревшее время встречи хуже промаха кэша
+# Файл хранит транскрипты пользователей — по умолчанию в data/ (в .gitignore и .dockerignore), а не в корне
+_CACHE_PATH = os.getenv("MISTRAL_CACHE_PATH", os.path.join("data", "mistral_cache.sqlite3"))
+_CACHE_TTL = float(os.getenv("MISTRAL_CACHE_TTL", "86400"))  # секунды; 0 — кэш выключен
+_cache_lock = threading.Lock()
+_cache_conn: sqlite3.Connection | None = None
+
+
+def _cache_db() -> sqlite3.Connection:
+    global _cache_conn
+    if _cache_conn is None:
+        cache_dir = os.path.dirname(_CACHE_PATH)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        conn = sqlite3.connect(_CACHE_PATH, check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        _cache_conn = conn
+    return _cache_conn
+
+
+def _cache_key(model: str, messages: list[ChatMessage], temperature: float | None, transcript: str, timed: bool) -> str:
+    payload: dict[str, Any] = {
+        "model": model,
+        "system": messages[0].content,
+        "transcript": transcript,
+        "t": temperature,
+        "max": _MAX_TOKENS,
+    }
+    if timed:
+        tz_name, now_local = _now_local()
+        payload["now"] = (tz_name, now_local)
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def _cache_get(key: str) -> str | None:
+    with _cache_lock:
+        row = _cache_db().execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+    if row is None or time.time() - row[1] > _CACHE_TTL:
+        return None
+    return row[0]
+
+
+def _cache_put(key: str, value: str) -> None:
+    with _cache_lock:
+        conn = _cache_db()
+        conn.execute("INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)", (key, value, time.time()))
+        conn.commit()
+
+
+# Семантический кэш (MISTRAL_SEM_CACHE=1): если точного совпадения нет, ищем транскрипт, близкий по смыслу.
+# Только для ответов без привязки ко времени (саммари): встречи соседнего транскрипта несут его абсолютные
+# даты и слоты, поэтому для timed-запросов работает лишь точный кэш по транскрипту и текущей минуте.
+# Нужны sentence-transformers и faiss-cpu — они не входят в requirements и импортируются лениво
+_SEM_CACHE = os.getenv("MISTRAL_SEM_CACHE") == "1" and _CACHE_TTL > 0
+_SEM_MODEL = os.getenv("MISTRAL_SEM_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+_SEM_THRESHOLD = float(os.getenv("MISTRAL_SEM_THRESHOLD", "0.92"))
+_sem_lock = threading.Lock()
+_sem_cache: "_SemanticCache | None" = None
+_sem_failed = False
+
+
+class _SemanticCache:
+    """Эмбеддинги транскриптов в SQLite рядом с точным кэшем; поиск — FAISS IndexFlatIP (косинус нормированных векторов)."""
+
+    def __init__(self) -> None:
+        import faiss  # type: ignore
+        import numpy as np  # type: ignore
+        from sentence_transformers import SentenceTransformer  # type: ignore
+
+        self._faiss, self._np = faiss, np
+        self._encoder = SentenceTransformer(_SEM_MODEL)
+        self._dim = self._encoder.get_sentence_embedding_dimension()
+        # пространство имён -> (индекс, [(ответ, created_at)] в порядке добавления)
+        self._indexes: dict[str, tuple[Any, list[tuple[str, float]]]] = {}
+        with _cache_lock:
+            conn = _cache_db()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (ns TEXT NOT NULL, vec BLOB NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("DELETE FROM embeddings WHERE created_at < ?", (time.time() - _CACHE_TTL,))
+            conn.commit()
+            rows = conn.execute("SELECT ns, vec, value, created_at FROM embeddings").fetchall()
+        for ns, vec, value, created_at in rows:
+            self._add(ns, np.frombuffer(vec, dtype=np.float32), value, created_at)
+
+    def encode(self, text: str) -> Any:
+        return self._encoder.encode([text], normalize_embeddings=True).astype(self._np.float32)[0]
+
+    def _add(self, ns: str, vec: Any, value: str, created_at: float) -> None:
+        entry = self._indexes.get(ns)
+        if entry is None:
+            entry = self._indexes[ns] = (self._faiss.IndexFlatIP(self._dim), [])
+        entry[0].add(vec.reshape(1, -1))
+        entry[1].append((value, created_at))
+
+    def lookup(self, ns: str, vec: Any) -> str | None:
+        with _sem_lock:
+            entry = self._indexes.get(ns)
+            if entry is None or entry[0].ntotal == 0:
+                return None
+            scores, ids = entry[0].search(vec.reshape(1, -1), 1)
+            score, idx = float(scores[0][0]), int(ids[0][0])
+            if idx < 0 or score < _SEM_THRESHOLD:
+                return None
+            value, created_at = entry[1][idx]
+        return value if time.time() - created_at <= _CACHE_TTL else None
+
+    def put(self, ns: str, vec: Any, value: str) -> None:
+        now = time.time()
+        with _sem_lock:
+            self._add(ns, vec, value, now)
+        with _cache_lock:
+            conn = _cache_db()
+            conn.execute(
+                "INSERT INTO embeddings (ns, vec, value, created_at) VALUES (?, ?, ?, ?)", (ns, vec.tobytes(), value, now)
+            )
+            conn.commit()
+
+
+def _get_sem_cache() -> _SemanticCache | None:
+    global _sem_cache, _sem_failed
+    if not _SEM_CACHE or _sem_failed:
+        return None
+    if _sem_cache is None:
+        with _sem_lock:
+            if _sem_cache is None and not _sem_failed:
+                try:
+                    _sem_cache = _SemanticCache()
+                except Exception:
+                    # нет зависимостей или модели — работаем только с точным кэшем
+                    _sem_failed = True
+    return _sem_cache
+
+
+def _sem_namespace(model: str, messages: list[ChatMessage], temperature: float | None) -> str:
+    # Близость ищем только среди ответов на тот же системный промпт той же модели
+    payload = {"model": model, "system": messages[0].content, "t": temperature, "max": _MAX_TOKENS}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def _sem_lookup(model: str, messages: list[ChatMessage], temperature: float | None, text: str) -> tuple[str | None, Any]:
+    """(ответ из семантического кэша или None, данные для _sem_store)."""
+    sem = _get_sem_cache()
+    if sem is None:
+        return None, None
+    ns, vec = _sem_namespace(model, messages, temperature), sem.encode(text)
+    return sem.lookup(ns, vec), (sem, ns, vec)
+
+
+def _sem_store(handle: Any, value: str) -> None:
+    if handle is not None:
+        sem, ns, vec = handle
+        sem.put(ns, vec, value)
+
+
+# Ответы — короткий текст или JSON до ~10 встреч; без лимита модель может генерировать до стоп-условия
+_MAX_TOKENS = int(os.getenv("MISTRAL_MAX_TOKENS", "800"))
+
+
+class _ArrayEnd:
+    """Находит в потоке текста конец верхнеуровневого JSON-массива (скобки внутри строк не считаются)."""
+
+    __slots__ = ("depth", "in_str", "esc")
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.in_str = False
+        self.esc = False
+
+    def feed(self, piece: str) -> bool:
+        for ch in piece:
+            if self.in_str:
+                if self.esc:
+                    self.esc = False
+                elif ch == "\\":
+                    self.esc = True
+                elif ch == '"':
+                    self.in_str = False
+            elif ch == "[":
+                self.depth += 1
+            elif self.depth:
+                if ch == '"':
+                    self.in_str = True
+                elif ch == "]":
+                    self.depth -= 1
+                    if self.depth == 0:
+                        return True
+        return False
+
+
+def _chat_fetch(model: str, messages: list[ChatMessage], temperature: float | None, array: bool) -> str:
+    client = get_mistral_client()
+    if not array:
+        resp = client.chat(model=model, messages=messages, temperature=temperature, max_tokens=_MAX_TOKENS)
+        return resp.choices[0].message.content or ""  # type: ignore[index]
+    # Массив встреч читаем потоком и закрываем соединение на закрывающей «]» — хвост ответа не ждём
+    stream = client.chat_stream(model=model, messages=messages, temperature=temperature, max_tokens=_MAX_TOKENS)
+    end, parts = _ArrayEnd(), []
+    try:
+        for chunk in stream:
+            piece = chunk.choices[0].delta.content or ""  # type: ignore[index]
+            parts.append(piece)
+            if end.feed(piece):
+                break
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+    return "".join(parts)
+
+
+async def _chat_fetch_async(model: str, messages: list[ChatMessage], temperature: float | None, array: bool) -> str:
+    client = get_mistral_async_client()
+    if not array:
+        resp = await client.chat(model=model, messages=messages, temperature=temperature, max_tokens=_MAX_TOKENS)
+        return resp.choices[0].message.content or ""  # type: ignore[index]
+    stream = client.chat_stream(model=model, messages=messages, temperature=temperature, max_tokens=_MAX_TOKENS)
+    end, parts = _ArrayEnd(), []
+    try:
+        async for chunk in stream:
+            piece = chunk.choices[0].delta.content or ""  # type: ignore[index]
+            parts.append(piece)
+            if end.feed(piece):
+                break
+    finally:
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    return "".join(parts)
+
+
+def _chat_cached(
+    model: str,
+    messages: list[ChatMessage],
+    transcript: str,
+    temperature: float | None = None,
+    timed: bool = False,
+    array: bool = False,
+) -> str:
     """
-    Строгое суммирование без домыслов.
-    - Саммари: перефразирование без новых фактов.
-    - Задачи: только явно сказанные поручения (кто/что/когда). Если нет — "Задачи: нет явных".
+    client.chat с кэшем ответов по транскрипту; возвращает текст первого варианта.
+    timed=True — ответ зависит от текущей даты (встречи); array=True — ответ JSON-массив, читается потоком.
     """
-    client = get_mistral_client()
+    key = _cache_key(model, messages, temperature, transcript, timed) if _CACHE_TTL > 0 else None
+    if key is not None:
+        cached = _cache_get(key)
+        if cached is not None:
+            return cached
+    handle = None
+    if _SEM_CACHE and not timed:
+        cached, handle = _sem_lookup(model, messages, temperature, transcript)
+        if cached is not None:
+            return cached
+    content = _chat_fetch(model, messages, temperature, array)
+    if key is not None and content:
+        _cache_put(key, content)
+        _sem_store(handle, content)
+    return content
+
+
+async def _chat_cached_async(
+    model: str,
+    messages: list[ChatMessage],
+    transcript: str,
+    temperature: float | None = None,
+    timed: bool = False,
+    array: bool = False,
+) -> str:
+    """Асинхронный _chat_cached: обращения к SQLite и эмбеддинги — в пуле потоков."""
+    key = _cache_key(model, messages, temperature, transcript, timed) if _CACHE_TTL > 0 else None
+    if key is not None:
+        cached = await run_in_thread(_cache_get, key)
+        if cached is not None:
+            return cached
+    handle = None
+    if _SEM_CACHE and not timed:
+        cached, handle = await run_in_thread(_sem_lookup, model, messages, temperature, transcript)
+        if cached is not None:
+            return cached
+    content = await _chat_fetch_async(model, messages, temperature, array)
+    if key is not None and content:
+        await run_in_thread(_cache_put, key, content)
+        if handle is not None:
+            await run_in_thread(_sem_store, handle, content)
+    return content
+
+
+# Короче этого в транскрипте не бывает ни задач, ни встреч («ок», «алло») — LLM не вызываем
+_MIN_CHARS = int(os.getenv("MISTRAL_MIN_CHARS", "20"))
+_EMPTY_SUMMARY = "Саммари: —\nЗадачи: нет явных"
+
+
+def _too_short(transcript: str) -> bool:
+    return len(transcript.strip()) < _MIN_CHARS
+
+
+@lru_cache(maxsize=8)
+def _zone(name: str) -> zoneinfo.ZoneInfo:
+    return zoneinfo.ZoneInfo(name)
+
+
+def _now_local() -> tuple[str, str]:
+    """(имя часового пояса встреч, текущее время в нём как YYYY-MM-DD HH:MM)."""
+    tz_name = os.getenv("MEETINGS_TZ", os.getenv("TZ", "Europe/Moscow"))
+    return tz_name, datetime.now(_zone(tz_name)).strftime("%Y-%m-%d %H:%M")
+
+
+def _summary_messages(transcript: str) -> list[ChatMessage]:
     system_prompt = (
         "Ты строго извлекаешь факты из русскоязычного транскрипта. НИЧЕГО НЕ ДОДУМЫВАЙ. "
         "1) Саммари — пересказ без добавления деталей. "
         "2) Перечисли только явные поручения (исполнитель и действие, опционально срок). "
         "3) Если явных задач нет — напиши 'Задачи: нет явных'."
     )
-    tz_name = os.getenv("MEETINGS_TZ", os.getenv("TZ", "Europe/Moscow"))
-    now_local = datetime.now(zoneinfo.ZoneInfo(tz_name)).strftime("%Y-%m-%d %H:%M")
+    tz_name, now_local = _now_local()
     user_prompt = (
         f"Сейчас: {now_local} ({tz_name}).\n"
         "Транскрипт:\n" + transcript + "\n\n"
@@ -40,14 +377,68 @@ def summarize_tasks(transcript: str) -> str:
         "Задачи:\n"
         "- <исполнитель>: <краткая формулировка>\n"
     )
-
-    model = os.getenv("MISTRAL_MODEL", "mistral-medium")
-    messages = [
+    return [
         ChatMessage(role="system", content=system_prompt),
         ChatMessage(role="user", content=user_prompt),
     ]
-    resp = client.chat(model=model, messages=messages)
-    return resp.choices[0].message.content  # type: ignore[index]
+
+
+def summarize_tasks(transcript: str) -> str:
+    """
+    Строгое суммирование без домыслов.
+    - Саммари: перефразирование без новых фактов.
+    - Задачи: только явно сказанные поручения (кто/что/когда). Если нет — "Задачи: нет явных".
+    """
+    if _too_short(transcript):
+        return _EMPTY_SUMMARY
+    model = os.getenv("MISTRAL_MODEL", "mistral-medium")
+    return _chat_cached(model, _summary_messages(transcript), transcript)
+
+
+async def summarize_tasks_async(transcript: str) -> str:
+    """Асинхронный вариант summarize_tasks — не занимает поток на время запроса к LLM."""
+    if _too_short(transcript):
+        return _EMPTY_SUMMARY
+    model = os.getenv("MISTRAL_MODEL", "mistral-medium")
+    return await _chat_cached_async(model, _summary_messages(transcript), transcript)
+
+
+# Разбор JSON из ответа LLM: шаблоны компилируются один раз
+_RX_FENCED_JSON = re.compile(r"```json\s*([\s\S]*?)```", re.IGNORECASE)
+_RX_FENCED = re.compile(r"```\s*([\s\S]*?)```")
+_RX_OBJ = re.compile(r"\{[\s\S]*\}")
+_RX_ARR = re.compile(r"\[[\s\S]*\]")
+
+
+def _bracketed(text: str, open_ch: str, close_ch: str) -> str | None:
+    # То же, что жадный regex open…close: от первой открывающей до последней закрывающей скобки
+    first = text.find(open_ch)
+    last = text.rfind(close_ch)
+    return text[first : last + 1] if first != -1 and last > first else None
+
+
+def _extract_json(text: str) -> dict:
+    # 0) частый случай — голый JSON без code fence: хватает find/rfind, regex не нужен
+    if "```" not in text:
+        span = _bracketed(text, "{", "}")
+        return _json_loads(span if span is not None else text)
+    # 1) fenced code block ```json ... ```
+    m = _RX_FENCED_JSON.search(text)
+    if m:
+        return _json_loads(m.group(1).strip())
+    # 2) any fenced block ``` ... ```
+    m = _RX_FENCED.search(text)
+    if m:
+        try:
+            return _json_loads(m.group(1).strip())
+        except Exception:
+            pass
+    # 3) first {...} block
+    m = _RX_OBJ.search(text)
+    if m:
+        return _json_loads(m.group(0))
+    # 4) direct parse
+    return _json_loads(text)
 
 
 def suggest_meeting_from_transcript(transcript: str) -> dict:
@@ -55,10 +446,10 @@ def suggest_meeting_from_transcript(transcript: str) -> dict:
     Возвращает словарь: {"title": str, "start_local": "YYYY-MM-DD HH:MM", "timezone": "Europe/Moscow", "duration_min": int}
     Если предложение не найдено — выбрасывает исключение.
     """
-    client = get_mistral_client()
+    if _too_short(transcript):
+        raise ValueError("transcript is too short for a meeting")
     model = os.getenv("MISTRAL_MODEL", "mistral-medium")
-    tz_name = os.getenv("MEETINGS_TZ", os.getenv("TZ", "Europe/Moscow"))
-    now_local = datetime.now(zoneinfo.ZoneInfo(tz_name)).strftime("%Y-%m-%d %H:%M")
+    tz_name, now_local = _now_local()
     system = (
         "Ты планировщик встреч. НИЧЕГО НЕ ДОДУМЫВАЙ. "
         "Верни одну встречу в JSON. Если дата произносится относительно (например 'в пятницу'), "
@@ -70,54 +461,24 @@ def suggest_meeting_from_transcript(transcript: str) -> dict:
         "Транскрипт:\n" + transcript + "\n\n"
         "Формат JSON: {\"title\":\"...\", \"start_local\":\"YYYY-MM-DD HH:MM\", \"timezone\":\"Europe/Moscow\", \"duration_min\":30}"
     )
-    resp = client.chat(
-        model=model,
-        messages=[
+    content = _chat_cached(
+        model,
+        [
             ChatMessage(role="system", content=system),
             ChatMessage(role="user", content=user),
         ],
+        transcript,
         temperature=0.0,
+        timed=True,
     )
-    content = resp.choices[0].message.content or ""  # type: ignore[index]
-    import json
-
-    def _extract_json(text: str) -> dict:
-        # 1) fenced code block ```json ... ```
-        m = re.search(r"```json\s*([\s\S]*?)```", text, re.IGNORECASE)
-        if m:
-            return json.loads(m.group(1).strip())
-        # 2) any fenced block ``` ... ```
-        m = re.search(r"```\s*([\s\S]*?)```", text)
-        if m:
-            try:
-                return json.loads(m.group(1).strip())
-            except Exception:
-                pass
-        # 3) first {...} block
-        m = re.search(r"\{[\s\S]*\}", text)
-        if m:
-            return json.loads(m.group(0))
-        # 4) direct parse
-        return json.loads(text)
-
     data = _extract_json(content)
     if not isinstance(data, dict):
         raise ValueError("invalid meeting json")
     return data
 
 
-def suggest_meetings_from_transcript(transcript: str) -> list[dict]:
-    """
-    Возвращает список встреч из транскрипта БЕЗ домысливаний.
-    Требуемый формат элемента:
-    {"title": str, "start_local": "YYYY-MM-DD HH:MM", "timezone": "Europe/Moscow", "duration_min": int}
-    Учитывать только явно названные во входе данные. Если информации недостаточно — не включать встречу.
-    Возвращай ТОЛЬКО JSON-массив без префиксов/комментариев. Язык входа — русский.
-    """
-    client = get_mistral_client()
-    model = os.getenv("MISTRAL_MODEL", "mistral-medium")
-    tz_name = os.getenv("MEETINGS_TZ", os.getenv("TZ", "Europe/Moscow"))
-    now_local = datetime.now(zoneinfo.ZoneInfo(tz_name)).strftime("%Y-%m-%d %H:%M")
+def _meetings_messages(transcript: str) -> list[ChatMessage]:
+    tz_name, now_local = _now_local()
     system = (
         "Ты извлекаешь ВСТРЕЧИ из транскрипта. НИЧЕГО НЕ ДОДУМЫВАЙ. "
         "Интерпретируй относительные даты/дни недели относительно текущего момента и указанного часового пояса. "
@@ -129,29 +490,29 @@ def suggest_meetings_from_transcript(transcript: str) -> list[dict]:
         "Транскрипт:\n" + transcript + "\n\n"
         "Возврати JSON-массив без текста вокруг."
     )
-    resp = client.chat(
-        model=model,
-        messages=[
-            ChatMessage(role="system", content=system),
-            ChatMessage(role="user", content=user),
-        ],
-        temperature=0.0,
-    )
-    content = resp.choices[0].message.content or ""
-    import json
-
-    def _extract_array(text: str) -> list[dict]:
-        m = re.search(r"```json\s*([\s\S]*?)```", text, re.IGNORECASE)
-        if m:
-            return json.loads(m.group(1).strip())
-        m = re.search(r"```\s*([\s\S]*?)```", text)
-        if m:
-            return json.loads(m.group(1).strip())
-        m = re.search(r"\[[\s\S]*\]", text)
-        if m:
-            return json.loads(m.group(0))
-        return json.loads(text)
+    return [
+        ChatMessage(role="system", content=system),
+        ChatMessage(role="user", content=user),
+    ]
 
+
+def _extract_array(text: str) -> list[dict]:
+    if "```" not in text:
+        span = _bracketed(text, "[", "]")
+        return _json_loads(span if span is not None else text)
+    m = _RX_FENCED_JSON.search(text)
+    if m:
+        return _json_loads(m.group(1).strip())
+    m = _RX_FENCED.search(text)
+    if m:
+        return _json_loads(m.group(1).strip())
+    m = _RX_ARR.search(text)
+    if m:
+        return _json_loads(m.group(0))
+    return _json_loads(text)
+
+
+def _parse_meetings(content: str) -> list[dict]:
     data = _extract_array(content)
     if not isinstance(data, list):
         raise ValueError("invalid meetings json")
@@ -174,3 +535,23 @@ def suggest_meetings_from_transcript(transcript: str) -> list[dict]:
     return cleaned
 
 
+def suggest_meetings_from_transcript(transcript: str) -> list[dict]:
+    """
+    Возвращает список встреч из транскрипта БЕЗ домысливаний.
+    Требуемый формат элемента:
+    {"title": str, "start_local": "YYYY-MM-DD HH:MM", "timezone": "Europe/Moscow", "duration_min": int}
+    Учитывать только явно названные во входе данные. Если информации недостаточно — не включать встречу.
+    Возвращай ТОЛЬКО JSON-массив без префиксов/комментариев. Язык входа — русский.
+    """
+    if _too_short(transcript):
+        return []
+    model = os.getenv("MISTRAL_MODEL", "mistral-medium")
+    return _parse_meetings(_chat_cached(model, _meetings_messages(transcript), transcript, temperature=0.0, timed=True, array=True))
+
+
+async def suggest_meetings_from_transcript_async(transcript: str) -> list[dict]:
+    """Асинхронный вариант suggest_meetings_from_transcript."""
+    if _too_short(transcript):
+        return []
+    model = os.getenv("MISTRAL_MODEL", "mistral-medium")
+    return _parse_meetings(await _chat_cached_async(model, _meetings_messages(transcript), transcript, temperature=0.0, timed=True, array=True))
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import os
+import secrets
+from functools import lru_cache
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
@@ -8,16 +10,24 @@ from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import RedirectResponse
 from google_auth_oauthlib.flow import Flow
 from google.oauth2.credentials import Credentials
-from sqlalchemy import select
+from requests.adapters import HTTPAdapter
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.aio import run_in_thread
+from app.calendar.google import invalidate_token_cache
 from app.db.models import OAuthToken, User
 from app.db.session import get_async_session
 
 
 router = APIRouter(prefix="/oauth/google", tags=["oauth"])
 
+# Общий пул keep-alive соединений к oauth2.googleapis.com для всех Flow
+_HTTP_ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=16)
 
+
+@lru_cache(maxsize=1)
 def _get_client_config() -> dict:
     client_id = os.getenv("GOOGLE_CLIENT_ID")
     client_secret = os.getenv("GOOGLE_CLIENT_SECRET")
@@ -44,16 +54,20 @@ def _scopes() -> list[str]:
     ]
 
 
-@router.get("/start")
-async def oauth_start(request: Request, tg_id: str | None = None) -> RedirectResponse:
+def _flow() -> Flow:
     flow = Flow.from_client_config(_get_client_config(), scopes=_scopes())
     flow.redirect_uri = os.getenv("GOOGLE_OAUTH_REDIRECT", "http://localhost:8000/oauth/google/callback")
+    flow.oauth2session.mount("https://", _HTTP_ADAPTER)
+    return flow
+
+
+@router.get("/start")
+async def oauth_start(request: Request, tg_id: str | None = None) -> RedirectResponse:
+    flow = _flow()
 
     # Сформируем один параметр state, содержащий tg_id (без добавления второго state в URL)
     custom_state = None
     if tg_id:
-        import secrets
-
         nonce = secrets.token_urlsafe(8)
         custom_state = f"{nonce}:{tg_id}"
 
@@ -80,11 +94,11 @@ async def _get_or_create_user(session: AsyncSession, tg_id: Optional[int] = None
 
 @router.get("/callback")
 async def oauth_callback(code: str, state: Optional[str] = None, session: AsyncSession = Depends(get_async_session)):
-    flow = Flow.from_client_config(_get_client_config(), scopes=_scopes())
-    flow.redirect_uri = os.getenv("GOOGLE_OAUTH_REDIRECT", "http://localhost:8000/oauth/google/callback")
+    flow = _flow()
 
     try:
-        flow.fetch_token(code=code)
+        # fetch_token синхронный — не блокируем event loop
+        await run_in_thread(lambda: flow.fetch_token(code=code))
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=400, detail=f"Failed to fetch token: {exc}")
 
@@ -107,27 +121,27 @@ async def oauth_callback(code: str, state: Optional[str] = None, session: AsyncS
         if expires_at.tzinfo is None:
             expires_at = expires_at.replace(tzinfo=timezone.utc)
 
-    token = OAuthToken(
+    # upsert по (user_id, provider) одним запросом; refresh_token Google присылает не всегда — старый сохраняем
+    stmt = pg_insert(OAuthToken).values(
         user_id=user.id,
         provider="google",
         access_token=creds.token,
         refresh_token=creds.refresh_token,
         expires_at=expires_at,
     )
-    # upsert по (user_id, provider)
-    existing = await session.execute(
-        select(OAuthToken).where(OAuthToken.user_id == user.id, OAuthToken.provider == "google")
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[OAuthToken.user_id, OAuthToken.provider],
+        set_={
+            "access_token": stmt.excluded.access_token,
+            "refresh_token": func.coalesce(stmt.excluded.refresh_token, OAuthToken.refresh_token),
+            "expires_at": stmt.excluded.expires_at,
+        },
     )
-    existing = existing.scalar_one_or_none()
-    if existing:
-        existing.access_token = token.access_token
-        existing.refresh_token = token.refresh_token or existing.refresh_token
-        existing.expires_at = token.expires_at
-    else:
-        session.add(token)
-
+    await session.execute(stmt)
     await session.commit()
+    # старый токен в кэше процесса мог быть выдан без новых прав
+    invalidate_token_cache(user.id)
 
-    return {"status": "ok", "user_id": user.id, "has_refresh_token": bool(token.refresh_token)}
+    return {"status": "ok", "user_id": user.id, "has_refresh_token": bool(creds.refresh_token)}
 
 
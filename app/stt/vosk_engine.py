@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-import io
+import asyncio
 import json
 import os
 import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from typing import Optional
 from pathlib import Path
 import shutil
@@ -11,9 +13,21 @@ import shutil
 import ffmpeg  # type: ignore
 from vosk import Model, KaldiRecognizer, SetLogLevel  # type: ignore
 
+from app.aio import run_in_thread
+
 
 _model_lock = threading.Lock()
 _model: Optional[Model] = None
+# Свой KaldiRecognizer на поток (процесс пула): создание дорогое, между файлами — Reset()
+_tls = threading.local()
+
+# Блок PCM для AcceptWaveform: полсекунды — меньше переходов Python↔C, чем по 4000 байт
+_VOSK_CHUNK = 16000
+
+_FFMPEG_NOT_FOUND = (
+    "Не найден исполняемый файл ffmpeg. Установите ffmpeg, либо укажите путь в FFMPEG_BINARY, "
+    "либо поместите портативную версию в каталог tools/"
+)
 
 
 def _get_model_path() -> str:
@@ -23,6 +37,7 @@ def _get_model_path() -> str:
 
 def _ensure_model_loaded() -> Model:
     global _model
+    # Горячий путь без блокировки: после warmup_vosk модель уже загружена
     if _model is not None:
         return _model
     with _model_lock:
@@ -42,6 +57,47 @@ def _ensure_model_loaded() -> Model:
     return _model  # type: ignore[return-value]
 
 
+async def warmup_vosk() -> bool:
+    """
+    Загружает модель при старте приложения, чтобы первое голосовое не ждало её секунды.
+    Пул STT-процессов создаётся позже и при fork наследует уже загруженную модель.
+    Возвращает False, если модель недоступна — бот при этом продолжает работать.
+    """
+    try:
+        await run_in_thread(_ensure_model_loaded)
+    except Exception:
+        return False
+    return True
+
+
+def _init_worker() -> None:
+    # Модель грузится при старте процесса пула; если её нет — ошибку покажет первый вызов,
+    # а не сломанный пул (исключение в initializer делает пул BrokenProcessPool)
+    try:
+        _ensure_model_loaded()
+    except Exception:
+        pass
+
+
+# Распознавание упирается в CPU и держит GIL внутри Kaldi — отдельные процессы со своей моделью
+# параллелят его по ядрам, не мешая event loop; процессы стартуют при первом вызове
+_pool = ProcessPoolExecutor(
+    max_workers=int(os.getenv("STT_WORKERS", str(max(1, (os.cpu_count() or 2) // 2)))),
+    initializer=_init_worker,
+)
+
+
+def _thread_recognizer(model: Model) -> KaldiRecognizer:
+    rec = getattr(_tls, "rec", None)
+    if rec is None or _tls.model is not model:
+        rec = KaldiRecognizer(model, 16000)
+        _tls.rec, _tls.model = rec, model
+    else:
+        # сбрасываем остаток прошлого файла (например, после ошибки ffmpeg)
+        rec.Reset()
+    return rec
+
+
 def _is_executable_file(path: Path) -> bool:
     try:
         return path.is_file() and os.access(str(path), os.X_OK)
@@ -67,7 +123,9 @@ def _resolve_env_ffmpeg(env_value: str) -> Optional[str]:
     return None
 
 
+@lru_cache(maxsize=1)
 def _get_ffmpeg_cmd() -> str:
+    # Результат кэшируется на процесс (glob по tools/ — это обход дерева); сброс — _get_ffmpeg_cmd.cache_clear()
     # 1) Явный путь/каталог в переменной окружения
     env_bin = os.getenv("FFMPEG_BINARY")
     if env_bin:
@@ -106,11 +164,10 @@ def _get_ffmpeg_cmd() -> str:
     raise FileNotFoundError("ffmpeg executable not found")
 
 
-def _convert_to_pcm16_mono16000(audio_bytes: bytes) -> bytes:
+def _open_ffmpeg(source: str, with_stdin: bool):
     try:
-        ffmpeg_cmd = _get_ffmpeg_cmd()
-        out, err = (
-            ffmpeg.input("pipe:")
+        return (
+            ffmpeg.input(source)
             .output(
                 "pipe:",
                 format="s16le",
@@ -118,57 +175,100 @@ def _convert_to_pcm16_mono16000(audio_bytes: bytes) -> bytes:
                 ac=1,
                 ar=16000,
             )
-            .run(capture_stdout=True, capture_stderr=True, input=audio_bytes, cmd=ffmpeg_cmd)
+            .run_async(pipe_stdin=with_stdin, pipe_stdout=True, pipe_stderr=True, cmd=_get_ffmpeg_cmd())
         )
     except FileNotFoundError as exc:  # ffmpeg не найден
-        raise RuntimeError(
-            "Не найден исполняемый файл ffmpeg. Установите ffmpeg, либо укажите путь в FFMPEG_BINARY, "
-            "либо поместите портативную версию в каталог tools/"
-        ) from exc
-    except ffmpeg.Error as exc:  # type: ignore[attr-defined]
-        stderr = getattr(exc, "stderr", b"")
-        msg = stderr.decode(errors="ignore") if isinstance(stderr, (bytes, bytearray)) else str(exc)
+        raise RuntimeError(_FFMPEG_NOT_FOUND) from exc
+
+
+def _feed_stdin(stdin, audio_bytes: bytes) -> None:
+    # Пишем вход кусками по 64 КБ в отдельном потоке, пока основной читает PCM
+    view = memoryview(audio_bytes)
+    try:
+        for offset in range(0, len(view), 65536):
+            stdin.write(view[offset : offset + 65536])
+    except (BrokenPipeError, OSError):
+        pass  # ffmpeg завершился раньше — ошибку покажет код возврата
+    finally:
+        try:
+            stdin.close()
+        except OSError:
+            pass
+
+
+def _recognize_ffmpeg(model: Model, source: str, audio_bytes: Optional[bytes]) -> str:
+    """
+    Декодирует source через ffmpeg и подаёт PCM в Vosk по мере чтения stdout —
+    без буфера на весь файл; декодирование идёт параллельно с распознаванием.
+    """
+    process = _open_ffmpeg(source, audio_bytes is not None)
+    writer: threading.Thread | None = None
+    if audio_bytes is not None:
+        writer = threading.Thread(target=_feed_stdin, args=(process.stdin, audio_bytes), daemon=True)
+        writer.start()
+    # stderr читаем в фоне, чтобы ffmpeg не встал на заполненном пайпе
+    stderr_chunks: list[bytes] = []
+    drain = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+    drain.start()
+
+    recognizer = _thread_recognizer(model)
+    parts: list[str] = []
+    try:
+        while True:
+            chunk = process.stdout.read(_VOSK_CHUNK)
+            if not chunk:
+                break
+            if recognizer.AcceptWaveform(chunk):
+                text = _result_text(recognizer.Result())
+                if text:
+                    parts.append(text)
+    finally:
+        process.stdout.close()
+        if writer is not None:
+            writer.join()
+        returncode = process.wait()
+        drain.join()
+    if returncode != 0:
+        msg = b"".join(stderr_chunks).decode(errors="ignore")
         raise RuntimeError(f"Ошибка конвертации аудио через ffmpeg: {msg}")
-    return out
+
+    final_text = _result_text(recognizer.FinalResult())
+    if final_text:
+        parts.append(final_text)
+    return " ".join(parts).strip()
 
 
 def recognize_speech_ru(audio_bytes: bytes) -> str:
     """
     Распознаёт речь на русском языке из произвольного аудио (OGG/OPUS/MP3/MP4/WEBM/WAV ...).
     Возвращает распознанный текст (может быть пустой строкой).
-    Выполняется синхронно; выносите в поток через asyncio.to_thread.
+    Выполняется синхронно и грузит CPU — из async-кода вызывайте recognize_speech_ru_async
+    или recognize_speech_ru_path_async (пул процессов STT), а не поток.
     """
-    model = _ensure_model_loaded()
+    return _recognize_ffmpeg(_ensure_model_loaded(), "pipe:", audio_bytes)
 
-    # Конвертируем в требуемый PCM 16kHz mono
-    pcm = _convert_to_pcm16_mono16000(audio_bytes)
 
-    recognizer = KaldiRecognizer(model, 16000)
+def recognize_speech_ru_path(path: str) -> str:
+    """
+    То же, что recognize_speech_ru, но ffmpeg читает аудио из файла сам —
+    без копии всего файла в памяти процесса.
+    """
+    return _recognize_ffmpeg(_ensure_model_loaded(), path, None)
+
 
-    # Кормим по кускам, чтобы избегать больших буферов
-    chunk_size = 4000
-    offset = 0
-    partials: list[str] = []
-    while offset < len(pcm):
-        chunk = pcm[offset : offset + chunk_size]
-        offset += chunk_size
-        if recognizer.AcceptWaveform(chunk):
-            try:
-                res = json.loads(recognizer.Result())
-                if isinstance(res, dict) and res.get("text"):
-                    partials.append(res["text"])  # type: ignore[index]
-            except Exception:
-                pass
+async def recognize_speech_ru_async(audio_bytes: bytes) -> str:
+    """recognize_speech_ru в пуле процессов STT."""
+    return await asyncio.get_running_loop().run_in_executor(_pool, recognize_speech_ru, audio_bytes)
 
-    try:
-        final = json.loads(recognizer.FinalResult())
-        final_text = final.get("text") if isinstance(final, dict) else ""
-    except Exception:
-        final_text = ""
 
-    parts = [p for p in partials if p]
-    if final_text:
-        parts.append(final_text)
-    return " ".join(parts).strip()
+async def recognize_speech_ru_path_async(path: str) -> str:
+    """recognize_speech_ru_path в пуле процессов STT."""
+    return await asyncio.get_running_loop().run_in_executor(_pool, recognize_speech_ru_path, path)
 
 
+def _result_text(raw: str) -> str:
+    try:
+        res = json.loads(raw)
+    except Exception:
+        return ""
+    return (res.get("text") or "") if isinstance(res, dict) else ""
@@ -1,77 +1,72 @@
 from __future__ import annotations
 
+import asyncio
 import os
 from datetime import datetime, timedelta, timezone
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.calendar.base import UnifiedEvent
 from app.calendar.google import GoogleCalendarProvider
 from app.db.models import Meeting, Notification, OAuthToken, User
 from app.db.session import session_factory
-from app.bot import build_bot
-from aiogram import types
-
-
-async def _upsert_meeting(
-    session: AsyncSession,
-    user: User,
-    event_id: str,
-    title: str | None,
-    start_at: datetime,
-    end_at: datetime | None,
-    location: str | None,
-    description: str | None,
-) -> Meeting:
-    result = await session.execute(
-        select(Meeting).where(Meeting.user_id == user.id, Meeting.external_id == event_id)
-    )
-    meeting: Meeting | None = result.scalar_one_or_none()
-    if meeting is None:
-        meeting = Meeting(
-            user_id=user.id,
-            title=title,
-            start_at=start_at,
-            end_at=end_at,
-            location=location,
-            description=description,
-            external_id=event_id,
-        )
-        session.add(meeting)
-        await session.flush()
-    else:
-        meeting.title = title
-        meeting.start_at = start_at
-        meeting.end_at = end_at
-        meeting.location = location
-        meeting.description = description
-    return meeting
-
-
-async def _ensure_notification(
-    session: AsyncSession, meeting_id: int, user_id: int, scheduled_at: datetime
-) -> None:
-    # не создавать прошедшие напоминания
-    if scheduled_at <= datetime.now(timezone.utc):
-        return
-    existing = await session.execute(
-        select(Notification).where(
-            Notification.meeting_id == meeting_id,
-            Notification.scheduled_at == scheduled_at,
-        )
-    )
-    if existing.scalar_one_or_none() is not None:
+from aiogram import Bot, types
+
+
+# сколько пользователей синхронизируется одновременно (запросы к Google + соединения пула БД)
+_GCAL_CONCURRENCY = int(os.getenv("GCAL_CONCURRENCY", "8"))
+
+# напоминания: -1 день, -1 час от начала
+_REMINDER_OFFSETS = (timedelta(days=1), timedelta(hours=1))
+
+
+async def _sync_user_events(session: AsyncSession, user: User, events: list[UnifiedEvent]) -> None:
+    """Upsert встреч и напоминаний пользователя двумя INSERT ... ON CONFLICT вместо запросов на событие."""
+    # Один multi-row ON CONFLICT DO UPDATE не может дважды задеть одну строку (CardinalityViolation) —
+    # повторы id в ответе Google схлопываем, побеждает последний
+    events = list({e.id: e for e in events}.values())
+    if not events:
         return
-    session.add(
-        Notification(
-            user_id=user_id,
-            meeting_id=meeting_id,
-            scheduled_at=scheduled_at,
-            status=None,
-            channel="telegram",
+    stmt = pg_insert(Meeting).values([
+        {
+            "user_id": user.id,
+            "title": e.title,
+            "start_at": e.start_at,
+            "end_at": e.end_at,
+            "location": e.location,
+            "description": e.description,
+            "external_id": e.id,
+        }
+        for e in events
+    ])
+    # конфликт по уникальному ix_meetings_user_external (user_id, external_id)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Meeting.user_id, Meeting.external_id],
+        set_={
+            "title": stmt.excluded.title,
+            "start_at": stmt.excluded.start_at,
+            "end_at": stmt.excluded.end_at,
+            "location": stmt.excluded.location,
+            "description": stmt.excluded.description,
+        },
+    ).returning(Meeting.id, Meeting.external_id)
+    meeting_ids = {ext_id: mid for mid, ext_id in (await session.execute(stmt)).all()}
+
+    # не создавать прошедшие напоминания
+    now = datetime.now(timezone.utc)
+    reminders = [
+        {"user_id": user.id, "meeting_id": meeting_ids[e.id], "scheduled_at": e.start_at - offset, "status": None, "channel": "telegram"}
+        for e in events
+        for offset in _REMINDER_OFFSETS
+        if e.start_at - offset > now
+    ]
+    if reminders:
+        await session.execute(
+            pg_insert(Notification).values(reminders).on_conflict_do_nothing(constraint="uq_notifications_meeting_sched")
         )
-    )
 
 
 async def sync_google_events() -> None:
@@ -86,38 +81,41 @@ async def sync_google_events() -> None:
             select(User).join(OAuthToken).where(OAuthToken.provider == "google")
         )
         users = res.scalars().all()
+        # токены всех пользователей одним запросом вместо SELECT на каждого
+        tokens = await GoogleCalendarProvider.preload_tokens(session, [u.id for u in users])
+
+    # Пользователи синхронизируются параллельно, каждый в своей сессии; ошибка одного не останавливает остальных
+    sem = asyncio.Semaphore(_GCAL_CONCURRENCY)
+    results = await asyncio.gather(
+        *(_sync_user(sem, user, tokens[user.id], time_min, time_max) for user in users if user.id in tokens),
+        return_exceptions=True,
+    )
+    for r in results:
+        if isinstance(r, Exception):
+            raise r
 
-        for user in users:
-            provider = GoogleCalendarProvider(session)
-            events = await provider.get_events(user, time_min, time_max)
-            for e in events:
-                meeting = await _upsert_meeting(
-                    session,
-                    user,
-                    e.id,
-                    e.title,
-                    e.start_at,
-                    getattr(e, "end_at", None),
-                    getattr(e, "location", None),
-                    getattr(e, "description", None),
-                )
-                # напоминания: -1 день, -1 час от начала
-                await _ensure_notification(session, meeting.id, user.id, e.start_at - timedelta(days=1))
-                await _ensure_notification(session, meeting.id, user.id, e.start_at - timedelta(hours=1))
 
+async def _sync_user(
+    sem: asyncio.Semaphore, user: User, token: OAuthToken, time_min: datetime, time_max: datetime
+) -> None:
+    async with sem, session_factory() as session:
+        # токен загружен в уже закрытой сессии — привязываем к своей, чтобы refresh сохранился при commit
+        session.add(token)
+        events = await GoogleCalendarProvider(session).get_events(user, time_min, time_max, token=token)
+        await _sync_user_events(session, user, events)
         await session.commit()
 
 
-def create_scheduler() -> AsyncIOScheduler:
+def create_scheduler(bot: Bot) -> AsyncIOScheduler:
     scheduler = AsyncIOScheduler(timezone="UTC")
     interval_minutes = int(os.getenv("SCHEDULER_INTERVAL_MINUTES", "10"))
     scheduler.add_job(sync_google_events, "interval", minutes=interval_minutes, id="sync-google")
-    # джоб на отправку уведомлений каждую минуту
-    scheduler.add_job(process_notifications, "interval", minutes=1, id="notify")
+    # джоб на отправку уведомлений каждую минуту; бот общий с приложением — его HTTP-сессия не пересоздаётся
+    scheduler.add_job(process_notifications, "interval", args=(bot,), minutes=1, id="notify")
     return scheduler
 
 
-async def process_notifications() -> None:
+async def process_notifications(bot: Bot) -> None:
     now = datetime.now(timezone.utc)
     async with session_factory() as session:
         # Выбрать запланированные и не отправленные
@@ -134,12 +132,10 @@ async def process_notifications() -> None:
         if not rows:
             return
 
-        bot = build_bot()
+        # Отправляем параллельно, в пределах лимита Telegram (~30 сообщений/с на бота)
+        sem = asyncio.Semaphore(25)
 
-        for notif, user, meeting in rows:
-            # Требуется tg_id для отправки
-            if user.tg_id is None:
-                continue
+        async def _send(notif: Notification, user: User, meeting: Meeting) -> None:
             start_str = meeting.start_at.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M UTC") if meeting.start_at else "?"
             title = meeting.title or "(без названия)"
 
@@ -151,13 +147,14 @@ async def process_notifications() -> None:
             ])
 
             text = f"Напоминание: {title}\nНачало: {start_str}"
-            try:
+            async with sem:
                 await bot.send_message(chat_id=user.tg_id, text=text, reply_markup=kb)
-            except Exception:
-                # не фейлим батч, просто пропускаем
-                continue
-
-            notif.sent_at = now
-        await session.commit()
-
 
+        # Требуется tg_id для отправки
+        batch = [(notif, user, meeting) for notif, user, meeting in rows if user.tg_id is not None]
+        results = await asyncio.gather(*(_send(*row) for row in batch), return_exceptions=True)
+        # не фейлим батч: неотправленные останутся для следующего прогона
+        sent_ids = [notif.id for (notif, _, _), result in zip(batch, results) if not isinstance(result, Exception)]
+        if sent_ids:
+            await session.execute(update(Notification).where(Notification.id.in_(sent_ids)).values(sent_at=now))
+            await session.commit()
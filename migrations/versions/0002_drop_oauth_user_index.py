@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0002_drop_oauth_user_index"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # uq_oauth_tokens_user_provider (user_id, provider) уже покрывает поиск по user_id
+    op.drop_index("ix_oauth_tokens_user_id", table_name="oauth_tokens")
+
+
+def downgrade() -> None:
+    op.create_index("ix_oauth_tokens_user_id", "oauth_tokens", ["user_id"])
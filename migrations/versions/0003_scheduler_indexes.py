@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003_scheduler_indexes"
+down_revision = "0002_drop_oauth_user_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Частичный индекс под выборку неотправленных напоминаний по времени
+    op.create_index(
+        "ix_notifications_pending",
+        "notifications",
+        ["scheduled_at"],
+        postgresql_where=sa.text("sent_at IS NULL"),
+    )
+    # До уникальных индексов убираем дубли, которые могла создать прежняя синхронизация.
+    # Напоминания дублей встреч переносим на оставшуюся (с наименьшим id), чтобы не потерять sent_at
+    op.execute(
+        """
+        UPDATE notifications n SET meeting_id = k.keep_id
+        FROM (
+            SELECT id, min(id) OVER (PARTITION BY user_id, external_id) AS keep_id
+            FROM meetings WHERE external_id IS NOT NULL
+        ) k
+        WHERE n.meeting_id = k.id AND k.id <> k.keep_id
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM meetings m USING meetings k
+        WHERE m.user_id = k.user_id AND m.external_id = k.external_id AND m.id > k.id
+        """
+    )
+    # Из одинаковых напоминаний оставляем отправленное, иначе с наименьшим id
+    op.execute(
+        """
+        DELETE FROM notifications n USING (
+            SELECT id, row_number() OVER (PARTITION BY meeting_id, scheduled_at ORDER BY sent_at IS NULL, id) AS rn
+            FROM notifications WHERE meeting_id IS NOT NULL
+        ) d
+        WHERE n.id = d.id AND d.rn > 1
+        """
+    )
+    # Цели ON CONFLICT для upsert встреч и напоминаний при синхронизации
+    op.create_index("ix_meetings_user_external", "meetings", ["user_id", "external_id"], unique=True)
+    op.create_unique_constraint("uq_notifications_meeting_sched", "notifications", ["meeting_id", "scheduled_at"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_notifications_meeting_sched", "notifications", type_="unique")
+    op.drop_index("ix_meetings_user_external", table_name="meetings")
+    op.drop_index("ix_notifications_pending", table_name="notifications")
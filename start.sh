@@ -22,6 +22,6 @@ fi
 # 3) Запуск приложения
 # 3) Применим миграции и запустим приложение
 alembic upgrade head || true
-exec uvicorn app.main:app --host 0.0.0.0 --port "${PORT:-8000}"
+exec uvicorn app.main:app --host 0.0.0.0 --port "${PORT:-8000}" --loop uvloop
 
 
@@ -0,0 +1,73 @@
+from app import mistral_client
+from app.mistral_client import _extract_array, _extract_json, _parse_meetings, suggest_meetings_from_transcript
+
+
+def test_extract_json_bare_and_fenced():
+    bare = 'Вот встреча: {"title": "Созвон", "duration_min": 30} — готово'
+    fenced = 'Ответ:\n```json\n{"title": "Созвон", "duration_min": 30}\n```'
+    assert _extract_json(bare) == {"title": "Созвон", "duration_min": 30}
+    assert _extract_json(fenced) == {"title": "Созвон", "duration_min": 30}
+
+
+def test_extract_array_bare_and_fenced():
+    bare = '[{"title": "A"}, {"title": "B"}]'
+    fenced = '```\n[{"title": "A"}]\n```'
+    assert [m["title"] for m in _extract_array(bare)] == ["A", "B"]
+    assert _extract_array(fenced) == [{"title": "A"}]
+
+
+def test_parse_meetings_skips_incomplete_items():
+    content = '[{"title": "Планёрка", "start_local": "2025-09-01 10:00"}, {"title": "Без даты"}, 42]'
+    assert _parse_meetings(content) == [
+        {"title": "Планёрка", "start_local": "2025-09-01 10:00", "timezone": "Europe/Moscow", "duration_min": 30}
+    ]
+
+
+def test_short_transcript_skips_llm():
+    # без MISTRAL_API_KEY вызов клиента упал бы — короткий текст до него не доходит
+    assert suggest_meetings_from_transcript("  ок  ") == []
+
+
+def test_cache_key_meetings_depend_on_minute_summary_does_not(monkeypatch):
+    transcript = "Созвонимся завтра в 15:00 по проекту"
+    now = {"value": ("Europe/Moscow", "2025-09-01 10:00")}
+    monkeypatch.setattr(mistral_client, "_now_local", lambda: now["value"])
+
+    def keys():
+        msgs = mistral_client._meetings_messages(transcript)
+        return (
+            mistral_client._cache_key("m", msgs, 0.0, transcript, True),
+            mistral_client._cache_key("m", mistral_client._summary_messages(transcript), None, transcript, False),
+        )
+
+    first = keys()
+    assert keys() == first
+    for later in ("2025-09-01 18:42", "2025-09-02 10:00"):
+        now["value"] = ("Europe/Moscow", later)
+        meetings_key, summary_key = keys()
+        assert meetings_key != first[0]
+        assert summary_key == first[1]
+
+
+class _FakeSemCache:
+    def encode(self, text):
+        return text
+
+    def lookup(self, ns, vec):
+        return "ответ похожего транскрипта"
+
+    def put(self, ns, vec, value):
+        pass
+
+
+def test_semantic_cache_never_serves_timed_answers(monkeypatch):
+    # похожий транскрипт другого дня: семантический кэш не должен отдавать его встречи
+    monkeypatch.setattr(mistral_client, "_CACHE_TTL", 0)
+    monkeypatch.setattr(mistral_client, "_SEM_CACHE", True)
+    monkeypatch.setattr(mistral_client, "_get_sem_cache", lambda: _FakeSemCache())
+    monkeypatch.setattr(mistral_client, "_chat_fetch", lambda *args: "ответ LLM")
+    transcript = "Давай встретимся завтра в 15:00"
+    meetings = mistral_client._chat_cached("m", mistral_client._meetings_messages(transcript), transcript, timed=True)
+    summary = mistral_client._chat_cached("m", mistral_client._summary_messages(transcript), transcript)
+    assert meetings == "ответ LLM"
+    assert summary == "ответ похожего транскрипта"